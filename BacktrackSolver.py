@@ -1,140 +1,306 @@
 import math
+from functools import partial
 from backtraking.ArcConsistency import ArcConsistency
 from backtraking.BackTrack import BackTracking
+from backtraking.Budget import Budget
 from backtraking.CUtil import CUtil
 from backtraking.Constraint import Constraint
+from backtraking.Propagation import Propagation
+from backtraking.SolveStats import SolveStats
+from backtraking.Topology import Topology
 import time
+from BoardSource import count_label, map_boards
 
 
-def solve_using_arc_consistency(constraint):
+def solve_using_arc_consistency(constraint, stats=None):
     arc = ArcConsistency(constraint)
     arc_consistent_sudoku = arc.ac3(constraint)
+    if stats is not None:
+        stats.collect(arc=arc)
     check_complete = arc.is_complete(constraint)
     if check_complete and arc_consistent_sudoku:
-        return arc_consistent_sudoku
+        return constraint.board
     return None
 
 
+def solve_using_propagation(constraint, rules, stats=None):
+    propagation = Propagation(constraint, rules)
+    consistent = propagation.propagate()
+    if stats is not None:
+        stats.collect(propagation=propagation)
+    if consistent and ArcConsistency.is_complete(constraint):
+        return constraint.board
+    return None
+
+
+def solve_using_backtrack(constraint, forward_check, mrv, degree, stats=None, max_nodes=None, deadline=None):
+    """
+    :return: the solved board and the number of backtracks, or None and FAILED (TIMED_OUT if the search gave up
+             on its max_nodes or deadline)
+    """
+    back_track = BackTracking(forward_check, max_nodes, deadline)
+    # the steps of the propagation before the search are already counted
+    propagation_steps = constraint.propagation.steps if constraint.propagation is not None else 0
+    backtrack_sudoku = back_track.backtracking_search(constraint, mrv, degree)
+    if stats is not None:
+        stats.collect(back_track=back_track)
+        if constraint.propagation is not None:
+            stats.propagations += constraint.propagation.steps - propagation_steps
+    if backtrack_sudoku != -1:
+        return [backtrack_sudoku[cell] for cell in range(len(constraint.board))], back_track.time
+    if back_track.timed_out:
+        return None, TIMED_OUT
+    return None, FAILED
+
+
+# How a board was solved
+ARC_CONSISTENCY = "arc consistency"
+PROPAGATION = "constraint propagation"
+BACKTRACKING = "back tracing"
+CACHED = "solution cache"
+
+# The number of backtracks of a board that was not solved, as written to the output file
+FAILED = -1
+TIMED_OUT = -2
+
+
+def parse_board(line_board, bitmask):
+    """ The domains of the cells of a board (see CUtil.generate_board)
+    :param line_board: Sudoku board - a line of n^2 chars or tokens (see CUtil.parse_line)
+    :return: the board and its box size
+    """
+    cells, box_size = CUtil.parse_line(line_board)
+    return CUtil.generate_board(cells, box_size, bitmask), box_size
+
+
+def solve_board(line_board, arc, forward_check, mrv, degree, propagation, bitmask, collect_stats=False,
+                budget=None):
+    """ Solve one board, on its own so the boards can be spread over processes
+    :param line_board: Sudoku board - a line of n^2 chars or tokens (see CUtil.parse_line)
+    :param collect_stats: count the work done on the board and time its phases (see SolveStats)
+    :param budget: the limits of the search (see Budget), None for no limit
+    :return: the solved board as a list of strings (None if it failed), how it was solved, the number of
+             backtracks (FAILED or TIMED_OUT if it failed), the time it took and the SolveStats of the board
+             (None when not collected)
+    """
+    start = time.time()
+    stats = SolveStats() if collect_stats else None
+    max_nodes, deadline = None, None
+    if budget is not None:
+        max_nodes, deadline = budget.max_nodes, budget.board_deadline()
+        if deadline is not None and start >= deadline:
+            # the batch ran out of time before the board started
+            return None, BACKTRACKING, TIMED_OUT, 0, stats
+    with SolveStats.timed(stats, "parse"):
+        board, box_size = parse_board(line_board, bitmask)
+    with SolveStats.timed(stats, "topology"):
+        constraint = Constraint(board, Topology.get(box_size), bitmask)
+
+    solve = None
+    method = None
+    backtrack_count = 0
+    if arc:
+        with SolveStats.timed(stats, "ac3"):
+            solve = solve_using_arc_consistency(constraint, stats)
+        method = ARC_CONSISTENCY
+
+    if solve is None and propagation:
+        with SolveStats.timed(stats, "propagation"):
+            solve = solve_using_propagation(constraint, propagation, stats)
+        method = PROPAGATION
+
+    if solve is None:
+        with SolveStats.timed(stats, "search"):
+            solve, backtrack_count = solve_using_backtrack(constraint, forward_check, mrv, degree, stats,
+                                                           max_nodes, deadline)
+        method = BACKTRACKING
+
+    if stats is not None:
+        stats.collect(constraint=constraint)
+    if solve is None:
+        return None, BACKTRACKING, backtrack_count, time.time() - start, stats
+    with SolveStats.timed(stats, "output"):
+        solution = BacktrackingSolver.board_as_strings(solve, constraint)
+    return solution, method, backtrack_count, time.time() - start, stats
+
+
+def count_solutions(line_board, limit=2, arc=False, forward_check=True, mrv=True, propagation=Propagation.RULES,
+                    budget=None):
+    """ Count the solutions of one board, up to limit - the search stops at the limit-th solution
+    :param line_board: Sudoku board - a line of n^2 chars or tokens (see CUtil.parse_line)
+    :param propagation: the rules of Propagation to use before and during the search, () for none
+    :param budget: the limits of the search (see Budget), None for no limit
+    :return: the number of solutions (limit if there are at least limit) and True if the search gave up on its
+             budget, so the count is only a lower bound
+    """
+    max_nodes, deadline = None, None
+    if budget is not None:
+        max_nodes, deadline = budget.max_nodes, budget.board_deadline()
+        if deadline is not None and time.time() >= deadline:
+            return 0, True
+    board, box_size = parse_board(line_board, bitmask=True)
+    constraint = Constraint(board, Topology.get(box_size), bitmask=True)
+    if arc and not ArcConsistency(constraint).ac3(constraint):
+        return 0, False
+    if propagation and not Propagation(constraint, propagation).propagate():
+        return 0, False
+
+    back_track = BackTracking(forward_check, max_nodes, deadline)
+    count = back_track.count_solutions(constraint, limit, mrv)
+    return count, back_track.timed_out
+
+
+def is_unique(line_board, budget=None):
+    """ Whether a board has exactly one solution, the search stops at the second one
+    :return: True or False, None if the search gave up on its budget before it knew
+    """
+    count, timed_out = count_solutions(line_board, limit=2, budget=budget)
+    if count >= 2:
+        return False
+    if timed_out:
+        return None
+    return count == 1
+
+
+def screen_boards(boards, workers=1, budget=None):
+    """ Check the uniqueness of a stream of boards in one pass, in a pool of processes when workers is not 1
+    :param boards: any iterable of board lines, read as it is checked
+    :return: the result of is_unique for each board, in the order of the boards
+    """
+    return map_boards(partial(is_unique, budget=budget), boards, workers)
+
+
 class BacktrackingSolver:
-    def __init__(self, boards, print_to_screen=True, arc=True, forward_check=True, mrv=True, print_to_file=None):
+    def __init__(self, boards, print_to_screen=True, arc=True, forward_check=True, mrv=True, print_to_file=None,
+                 bitmask=True, degree=False, propagation=(), workers=1, stats_hook=None, time_limit=None,
+                 max_nodes=None, deadline=None, cache=None):
 
-        self.box_size = []  # box size for each sudoku
-        self.boards = []  # an array containing all sudokus represented as dictionary
+        self.boards = boards  # the lines of the sudokus, any iterable - parsed one at a time when solved
         self.arc = arc  # use arc or not
         self.print_to_screen = print_to_screen
         self.fc = forward_check
         self.mrv = mrv
+        self.degree = degree  # with mrv, break ties by the number of unassigned peers
+        self.propagation = tuple(propagation)  # the rules of Propagation to use before and during the search
         self.print_to_file = print_to_file
+        self.bitmask = bitmask  # domains as integer masks (BitDomain) or as strings of candidates
+        self.workers = workers  # number of processes solving boards, None for one per core
+        self.stats_hook = stats_hook  # called with the board number and the SolveStats of every board, or None
+        self.time_limit = time_limit  # seconds for each board, None for no limit
+        self.max_nodes = max_nodes  # nodes of the search of each board, None for no limit
+        self.deadline = deadline  # seconds for all the boards of a solve, None for no limit
+        self.cache = cache  # a SolutionCache of the solved boards, or None to solve every board
 
-        for line_board in boards:
-            board = line_board.strip()  # strip the trailing "\n"
-
-            # calculate size of the board and the box
-            board_size = int(math.sqrt(len(board)))
-            box_size = int(math.sqrt(board_size))
-            self.box_size.append(box_size)
-
-            constructed_sudoku = self.construct_sudoku(board, board_size)
-
-            board = CUtil.generate_board(constructed_sudoku, box_size)
-            self.boards.append(board)
-
+    # Parses every board, so it reads a stream of boards to its end
     def get_grid_sizes(self):
-        return self.box_size
+        return [parse_board(line_board, self.bitmask)[1] for line_board in self.boards]
 
+    # Parses every board, so it reads a stream of boards to its end
     def get_boards(self):
-        return self.boards
+        return [parse_board(line_board, self.bitmask)[0] for line_board in self.boards]
 
     def solve(self):
         if self.print_to_screen:
-            print(f"\nStart solve {len(self.box_size)} boards with Solver {self.__str__()}\n")
+            print(f"\nStart solve {count_label(self.boards)} boards with Solver {self.__str__()}\n")
         success_counter = 0
-        for index, board in enumerate(self.boards):
-            start = time.time()
-
-            size_box = self.box_size[index]
-            board_constraints = CUtil.generate_constraint_dictionary(size_box)
-            constraint = Constraint(board, board_constraints, size_box)
-
-            if self.arc:
-                solve = solve_using_arc_consistency(constraint)
-                if solve is not None:
-                    end = time.time()
-                    if self.print_to_file is not None:
-                        self.print_to_file.write(
-                            f"{index + 1}, {0}, {end - start}\n")
-                    print(f" Board number {index + 1} solve successfully using arc consistency only ")
-                    if self.print_to_screen:
-                        self.print_board(solve, constraint.grid_size)
-                    success_counter += 1
-                    continue
-
-            solve, backtrack_count = self.solve_using_backtrack(constraint)
-            end = time.time()
-            if solve is not None:
+        board_counter = 0
+        for index, (solve, method, backtrack_count, elapsed, stats) in enumerate(self.solve_boards()):
+            board_counter += 1
+            if self.stats_hook is not None:
+                self.stats_hook(index + 1, stats)
+
+            if solve is None:
+                if self.print_to_file is not None:
+                    self.print_to_file.write(f"{index + 1}, {backtrack_count}, {elapsed} \n")
+                if backtrack_count == TIMED_OUT:
+                    print(f" Board number {index + 1} timed out after {elapsed}")
+                continue
+
+            if method == BACKTRACKING:
                 if self.print_to_file is not None:
-                    self.print_to_file.write(f"{index+1},{backtrack_count},{end - start}\n")
+                    self.print_to_file.write(f"{index+1},{backtrack_count},{elapsed}\n")
                 msg = f" Board number {index + 1} solve successfully using back tracing," \
-                    f" after {backtrack_count} attempts and time :{end - start}"
+                    f" after {backtrack_count} attempts and time :{elapsed}"
                 if self.mrv:
                     msg += ", using MRV"
+                if self.mrv and self.degree:
+                    msg += ", using Degree"
                 if self.fc:
                     msg += ", using FC"
                 if self.arc:
                     msg += ", using ARC"
+                if self.propagation:
+                    msg += ", using Propagation"
                 print(msg)
-                if self.print_to_screen:
-                    self.print_board(solve, constraint.grid_size)
-                success_counter += 1
-                continue
+            else:
+                if self.print_to_file is not None:
+                    self.print_to_file.write(
+                        f"{index + 1}, {0}, {elapsed}\n")
+                print(f" Board number {index + 1} solve successfully using {method} only ")
+
+            if self.print_to_screen:
+                self.print_board(solve, int(math.sqrt(math.sqrt(len(solve)))))
+            success_counter += 1
 
-            elif self.print_to_file is not None:
-                self.print_to_file.write(f"{index + 1}, -1, {end - start} \n")
+        return success_counter, board_counter
 
-        return success_counter, len(self.box_size)
+    def solve_boards(self):
+        """ Solve the boards, in a pool of processes when workers is not 1
+        :return: the result of solve_board for each board, in the order of the boards
+        """
+        solve_one = partial(solve_board, arc=self.arc, forward_check=self.fc, mrv=self.mrv, degree=self.degree,
+                            propagation=self.propagation, bitmask=self.bitmask,
+                            collect_stats=self.stats_hook is not None, budget=self.budget())
+        if self.cache is None:
+            return map_boards(solve_one, self.boards, self.workers)
+        return self.cache.solve_boards(self.boards, partial(map_boards, solve_one, workers=self.workers),
+                                       self.cached_result)
+
+    # The result of solve_board for a board found in the cache
+    def cached_result(self, solution, elapsed):
+        stats = None
+        if self.stats_hook is not None:
+            stats = SolveStats()
+            stats.phases["cache"] = elapsed
+        return solution, CACHED, 0, elapsed, stats
+
+    # The limits of the boards of a solve starting now
+    def budget(self):
+        if self.time_limit is None and self.max_nodes is None and self.deadline is None:
+            return None
+        deadline = time.time() + self.deadline if self.deadline is not None else None
+        return Budget(self.time_limit, self.max_nodes, deadline)
 
     def solve_using_backtrack(self, constraint):
-        back_track = BackTracking(self.fc)
-        backtrack_sudoku = back_track.backtracking_search(constraint, self.mrv)
-        if backtrack_sudoku != -1:
-            return backtrack_sudoku, back_track.time
-        return None, -1
+        return solve_using_backtrack(constraint, self.fc, self.mrv, self.degree)
 
     def __str__(self):
         msg = "Backtracking Solver"
         if self.mrv:
             msg += ", using MRV"
+        if self.mrv and self.degree:
+            msg += ", using Degree"
         if self.fc:
             msg += ", using FC"
         if self.arc:
             msg += ", using ARC"
+        if self.propagation:
+            msg += ", using Propagation"
         return msg
 
+    # The tokens of the values of a solved board (see CUtil.generate_tokens)
     @staticmethod
-    def construct_sudoku(line, sudoku_size):
-        sudoku = []
-        for i in range(sudoku_size):
-            start = i * sudoku_size
-            end = sudoku_size * (i + 1)
-            split_on_size = line[start: end]
-            row = BacktrackingSolver.get_array(split_on_size)
-            sudoku.append(row)
-
-        return sudoku
-
-    @staticmethod
-    def get_array(strings):
-        array = []
-        for string in strings:
-            array.append(string)
-        return array
+    def board_as_strings(board, constraint):
+        if not constraint.bitmask:
+            return board
+        values = CUtil.generate_tokens(constraint.grid_size)
+        return [values[mask.bit_length() - 1] for mask in board]
 
     @staticmethod
     def print_board(board, size_box):
         sudoku_size = size_box ** 2
-        sort_board = dict(sorted(board.items()))
         temp = [i for i in range(0, sudoku_size, size_box)]
-        for i, cell in enumerate(sort_board.values()):
+        for i, cell in enumerate(board):
             row, col = divmod(i, sudoku_size)
             if col == 0:
                 if row in temp:
@@ -156,9 +322,8 @@ class BacktrackingSolver:
     @staticmethod
     def print_board_empty(board, size_box):
         sudoku_size = size_box ** 2
-        sort_board = dict(sorted(board.items()))
         temp = [i for i in range(0, sudoku_size, size_box)]
-        for i, cell in enumerate(sort_board.values()):
+        for i, cell in enumerate(board):
             if len(cell) != 1:
                 cell = "0"
             row, col = divmod(i, sudoku_size)
@@ -0,0 +1,245 @@
+import time
+import numpy as np
+from BoardSource import PackedBoardFile, batched, count_label
+from backtraking.BackTrack import BackTracking
+from backtraking.Budget import Budget
+from backtraking.CUtil import CUtil
+from backtraking.Constraint import Constraint
+from backtraking.Propagation import Propagation
+from backtraking.Topology import Topology
+from BacktrackSolver import BacktrackingSolver, BACKTRACKING, FAILED, TIMED_OUT
+
+# How a board of a batch was solved, BACKTRACKING for the boards that needed the search
+BATCH_PROPAGATION = "batch propagation"
+
+
+class BatchPropagation:
+    """ Naked and hidden singles applied to many boards of the same size at once.
+
+    The boards are the rows of an (boards, cells) array of candidate masks (see BitDomain), and every rule is a
+    handful of array operations over all the boards:
+        naked singles:  OR the masks of the single peers of every cell (peers is a (cells, peers) index array)
+                        and remove them from the cell
+        hidden singles: for every unit, the values seen exactly once in the unit are found by folding its cells
+                        into 'seen once' and 'seen twice' masks, and the cell holding such a value gets it
+    The rules are repeated on the boards that changed in the last round until no board changes.
+    """
+    SOLVED = 1
+    OPEN = 0
+    FAILED = -1
+
+    def __init__(self, topology):
+        board_size = topology.board_size
+        self.peers = np.array(topology.peers, dtype=np.intp)
+        units = np.array(topology.units, dtype=np.intp)
+        # rows, columns and grids - in each group every cell appears exactly once
+        self.unit_groups = (units[:board_size], units[board_size:2 * board_size], units[2 * board_size:])
+        self.dtype = np.uint32 if board_size <= 32 else np.uint64
+        self.full = (1 << board_size) - 1
+
+    def propagate(self, domains):
+        """
+        :param domains: (boards, cells) array of masks, reduced in place
+        :return: the status of each board - SOLVED, OPEN (needs search) or FAILED (no solution)
+        """
+        failed = np.zeros(len(domains), dtype=bool)
+        active = np.arange(len(domains))
+        while len(active):
+            board = domains[active]
+            before = board.copy()
+            consistent = self.__naked_singles(board) & self.__hidden_singles(board)
+            domains[active] = board
+
+            failed[active[~consistent]] = True
+            changed = (board != before).any(axis=1) & consistent
+            active = active[changed]
+
+        single = ((domains & (domains - 1)) == 0).all(axis=1)
+        status = np.where(single, BatchPropagation.SOLVED, BatchPropagation.OPEN)
+        status[failed] = BatchPropagation.FAILED
+        return status
+
+    def __naked_singles(self, board):
+        single = (board & (board - 1)) == 0
+        single_values = np.where(single, board, 0).astype(self.dtype)
+        taken = np.bitwise_or.reduce(single_values[:, self.peers], axis=2)
+
+        conflict = (single & (board & taken != 0)).any(axis=1)
+        board[:] = np.where(single, board, board & ~taken)
+        return ~conflict & (board != 0).all(axis=1)
+
+    def __hidden_singles(self, board):
+        consistent = np.ones(len(board), dtype=bool)
+        for group in self.unit_groups:
+            units = board[:, group]  # (boards, units, cells of the unit)
+            once = np.zeros(units.shape[:2], dtype=self.dtype)
+            twice = np.zeros(units.shape[:2], dtype=self.dtype)
+            for position in range(units.shape[2]):
+                cell = units[:, :, position]
+                twice |= once & cell
+                once |= cell
+            exactly_once = once & ~twice
+
+            hidden = units & exactly_once[:, :, None]
+            # a value missing from a unit, or a cell that is the only place of two values
+            consistent &= (once == self.full).all(axis=1)
+            consistent &= ((hidden & (hidden - 1)) == 0).all(axis=(1, 2))
+            board[:, group] = np.where(hidden != 0, hidden, units)
+        return consistent
+
+
+class BatchSolver:
+    def __init__(self, boards, print_to_screen=True, forward_check=True, mrv=True, print_to_file=None,
+                 propagation=(), batch_size=4096, time_limit=None, max_nodes=None, deadline=None):
+        self.boards = boards
+        self.print_to_screen = print_to_screen
+        self.fc = forward_check
+        self.mrv = mrv
+        self.print_to_file = print_to_file
+        self.propagation = tuple(propagation)  # the rules of Propagation for the boards that need search
+        self.batch_size = batch_size  # number of boards propagated together
+        self.time_limit = time_limit  # seconds for the search of each board, None for no limit
+        self.max_nodes = max_nodes  # nodes of the search of each board, None for no limit
+        self.deadline = deadline  # seconds for all the boards of a solve, None for no limit
+        self.budget = None
+
+    def __str__(self):
+        msg = "Batch Solver"
+        if self.mrv:
+            msg += ", using MRV"
+        if self.fc:
+            msg += ", using FC"
+        if self.propagation:
+            msg += ", using Propagation"
+        return msg
+
+    def solve(self):
+        """ Propagate the boards in batches of the same size, and search only the boards that propagation did
+        not decide. The time of a batch is shared equally by its boards, a board that needs search adds its
+        search time.
+        :return: the number of boards solved and the number of boards
+        """
+        if self.print_to_screen:
+            print(f"\nStart solve {count_label(self.boards)} boards with Solver {self.__str__()}\n")
+        success_counter = 0
+        first = 0
+        deadline = time.time() + self.deadline if self.deadline is not None else None
+        self.budget = Budget(self.time_limit, self.max_nodes, deadline)
+        for results in self.__solve_batches():
+            for index, (solution, method, backtrack_count, board_time, box_size) in enumerate(results):
+                board_number = first + index + 1
+                if solution is not None:
+                    if self.print_to_file is not None:
+                        self.print_to_file.write(f"{board_number},{backtrack_count},{board_time}\n")
+                    if method == BATCH_PROPAGATION:
+                        print(f" Board number {board_number} solve successfully using batch propagation only ")
+                    else:
+                        print(f" Board number {board_number} solve successfully using back tracing,"
+                              f" after {backtrack_count} attempts and time :{board_time}")
+                    if self.print_to_screen:
+                        BacktrackingSolver.print_board(solution, box_size)
+                    success_counter += 1
+                else:
+                    if self.print_to_file is not None:
+                        self.print_to_file.write(f"{board_number}, {backtrack_count}, {board_time} \n")
+                    if backtrack_count == TIMED_OUT:
+                        print(f" Board number {board_number} timed out after {board_time}")
+            first += len(results)
+
+        return success_counter, first
+
+    def __solve_batches(self):
+        """
+        :return: the results of __solve_domains for each batch of boards, in the order of the boards
+        """
+        if isinstance(self.boards, PackedBoardFile):
+            # the domains are made from the records of the file, without parsing lines
+            for first in range(0, len(self.boards), self.batch_size):
+                start = time.time()
+                stop = min(first + self.batch_size, len(self.boards))
+                yield self.__solve_domains(self.__packed_domains(first, stop), self.boards.box_size, start)
+            return
+
+        for batch in batched(self.boards, self.batch_size):
+            boards = [CUtil.parse_line(line) for line in batch]
+
+            # the boards of each size are propagated together
+            by_size = dict()
+            for index, (_, box_size) in enumerate(boards):
+                by_size.setdefault(box_size, []).append(index)
+
+            results = [None] * len(boards)
+            for box_size, indexes in by_size.items():
+                for index, result in zip(indexes, self.__solve_same_size([boards[i][0] for i in indexes], box_size)):
+                    results[index] = result
+            yield results
+
+    def __packed_domains(self, first, stop):
+        """ The (boards, cells) array of masks of the boards first..stop-1 of a packed corpus
+        """
+        boards = self.boards
+        dtype = np.dtype('<u2') if boards.bits == 16 else np.uint8
+        records = np.frombuffer(boards.records(first, stop), dtype=dtype).reshape(stop - first, -1)
+        if boards.bits == 4:
+            records = np.stack((records >> 4, records & 15), axis=2).reshape(stop - first, -1)
+        cells = records[:, :boards.number_of_cells].astype(np.int64)
+
+        board_size = boards.box_size ** 2
+        dtype = np.uint32 if board_size <= 32 else np.uint64
+        # cell value k is the mask 1 << (k - 1), an empty cell has every value
+        return np.where(cells > 0, np.left_shift(1, np.maximum(cells - 1, 0)), (1 << board_size) - 1).astype(dtype)
+
+    def __solve_same_size(self, boards, box_size):
+        """
+        :param boards: the values of the cells of each board as numbers (see CUtil.parse_line)
+        :return: the results of __solve_domains
+        """
+        start = time.time()
+        board_size = box_size * box_size
+        domains = np.array([CUtil.generate_board(cells, box_size, bitmask=True) for cells in boards],
+                           dtype=np.uint32 if board_size <= 32 else np.uint64)
+        return self.__solve_domains(domains, box_size, start)
+
+    def __solve_domains(self, domains, box_size, start):
+        """
+        :param domains: (boards, cells) array of the masks of boards of the same size
+        :param start: the time the batch started, shared equally by its boards
+        :return: for each board - the solved board as a list of strings (None if it failed), how it was solved
+                 (BATCH_PROPAGATION or BACKTRACKING), the number of backtracks, the time and the box size
+        """
+        topology = Topology.get(box_size)
+        values = CUtil.generate_tokens(box_size)
+        batch = BatchPropagation(topology)
+        status = batch.propagate(domains)
+        shared_time = (time.time() - start) / len(domains)
+
+        results = []
+        for board, board_status in zip(domains, status):
+            if board_status == BatchPropagation.FAILED:
+                results.append((None, BATCH_PROPAGATION, FAILED, shared_time, box_size))
+                continue
+            start = time.time()
+            constraint = Constraint([int(mask) for mask in board], topology, bitmask=True)
+            backtrack_count = 0
+            if board_status == BatchPropagation.OPEN:
+                solution, backtrack_count = self.__search(constraint)
+                method = BACKTRACKING
+            else:
+                solution = constraint.board
+                method = BATCH_PROPAGATION
+            board_time = shared_time + time.time() - start
+            if solution is None:
+                results.append((None, method, backtrack_count, board_time, box_size))
+            else:
+                results.append(([values[mask.bit_length() - 1] for mask in solution], method, backtrack_count,
+                                board_time, box_size))
+        return results
+
+    def __search(self, constraint):
+        if self.propagation and not Propagation(constraint, self.propagation).propagate():
+            return None, FAILED
+        back_track = BackTracking(self.fc, self.budget.max_nodes, self.budget.board_deadline())
+        state = back_track.backtracking_search(constraint, self.mrv)
+        if state == -1:
+            return None, TIMED_OUT if back_track.timed_out else FAILED
+        return [state[cell] for cell in range(len(constraint.board))], back_track.time
@@ -0,0 +1,204 @@
+"""
+    The benchmark of the solvers: every configuration runs over every corpus, one board at a time in this process,
+    and the results are written as JSON:
+
+        {"corpora": {"hard_95": {"bk_arc_fc_mrv": {"boards": 95, "solved": 95, "timed_out": 0,
+                                                   "timed_out_boards": [], "wall_time": 1.9,
+                                                   "time": {"mean": .., "p50": .., "p90": .., "p99": .., "max": ..},
+                                                   "nodes": {"total": .., "mean": .., "p50": .., ...}}}}}
+
+    A configuration is a solver name as in ReportScheduler: "lr", "dlx", or "bk" with the heuristics in the name
+    ("bk" alone is plain backtracking, "bk_arc_fc_mrv" uses all of them). The nodes of a board are the calls of
+    the backtracking search (see SolveStats), the backtracks of Dancing Links and 0 for the linear programming
+    solver. A board that reaches --time-limit or --max-nodes is counted as timed out and its number is listed in
+    "timed_out_boards" (Dancing Links has no limits). The limits are on by default (TIME_LIMIT and MAX_NODES), so
+    the slow configurations end on the hard corpora and the default run is bounded; 0 turns a limit off.
+
+    Given a baseline (the JSON of an earlier run), every configuration that got slower than the tolerance allows,
+    made more nodes or solved fewer boards is reported as a regression, and the command exits with status 1:
+
+        python Benchmark.py --boards 20 --output benchmark.json
+        python Benchmark.py --boards 20 --baseline benchmark_baseline.json --tolerance 0.25
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import platform
+import sys
+import time
+
+import BacktrackSolver as BkSolver
+import DancingLinksSolver as DlxSolver
+import LinearProgrammingSolver as LpSolver
+from BoardSource import open_corpus
+from backtraking.Budget import Budget
+
+CORPORA = ("easy_1000", "hard_95", "hardest_11", "sudoku_16", "sudoku_25")
+CONFIGS = tuple("_".join(("bk",) + heuristics)
+                for size in range(4)
+                for heuristics in itertools.combinations(("arc", "fc", "mrv"), size)) + ("lr",)
+PERCENTILES = (50, 90, 99)
+# The default limits of a board, a plain backtracking search of a hard board can run for minutes
+TIME_LIMIT = 2.0
+MAX_NODES = 100000
+
+
+def solve_one(config, board, budget=None):
+    """ Solve a board with a configuration
+    :param budget: the limits of the board (see Budget), None for no limit
+    :return: True if the board was solved, True if it timed out, and the number of nodes of the search
+    """
+    if config == "lr":
+        solution, _, _, timed_out = LpSolver.solve_board(board, budget=budget)
+        return solution is not None, timed_out, 0
+    if config == "dlx":
+        solution, backtrack_count = DlxSolver.DancingLinksSolver.solve_board(board)
+        return solution is not None, False, backtrack_count
+
+    heuristics = config.split("_")[1:]
+    solution, _, backtrack_count, _, stats = BkSolver.solve_board(board, arc="arc" in heuristics,
+                                                                  forward_check="fc" in heuristics,
+                                                                  mrv="mrv" in heuristics, degree=False,
+                                                                  propagation=(), bitmask=True, collect_stats=True,
+                                                                  budget=budget)
+    return solution is not None, backtrack_count == BkSolver.TIMED_OUT, stats.nodes
+
+
+def percentile(values, p):
+    """ The nearest-rank percentile of sorted values
+    """
+    if not values:
+        return 0
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+def summary(values):
+    values = sorted(values)
+    result = {"mean": sum(values) / len(values) if values else 0}
+    for p in PERCENTILES:
+        result[f"p{p}"] = percentile(values, p)
+    result["max"] = values[-1] if values else 0
+    return result
+
+
+def run_config(config, boards, budget=None):
+    times = []
+    nodes = []
+    solved = 0
+    timed_out_boards = []
+    start = time.perf_counter()
+    for number, board in enumerate(boards, start=1):
+        board_start = time.perf_counter()
+        board_solved, board_timed_out, board_nodes = solve_one(config, board, budget)
+        times.append(time.perf_counter() - board_start)
+        nodes.append(board_nodes)
+        solved += board_solved
+        if board_timed_out:
+            timed_out_boards.append(number)
+    wall_time = time.perf_counter() - start
+
+    node_summary = summary(nodes)
+    node_summary["total"] = sum(nodes)
+    return {"boards": len(times), "solved": solved, "timed_out": len(timed_out_boards),
+            "timed_out_boards": timed_out_boards, "wall_time": wall_time, "time": summary(times),
+            "nodes": node_summary}
+
+
+def run(corpora, configs, boards_limit=None, corpus_dir="sudoku_boards_txt", time_limit=TIME_LIMIT,
+        max_nodes=MAX_NODES):
+    """
+    :param time_limit: seconds for each board, None for no limit
+    :param max_nodes: nodes of the search of each board, None for no limit
+    """
+    budget = None
+    if time_limit is not None or max_nodes is not None:
+        budget = Budget(time_limit, max_nodes)
+    results = {"python": platform.python_version(), "machine": platform.machine(),
+               "date": time.strftime("%Y-%m-%d %H:%M:%S"), "boards_limit": boards_limit,
+               "time_limit": time_limit, "max_nodes": max_nodes, "corpora": dict()}
+    for corpus in corpora:
+        path = os.path.join(corpus_dir, corpus + ".txt")
+        with open_corpus(path) as corpus_boards:
+            boards = list(itertools.islice(corpus_boards, boards_limit))
+        results["corpora"][corpus] = dict()
+        for config in configs:
+            result = run_config(config, boards, budget)
+            results["corpora"][corpus][config] = result
+            print(f"\t{corpus:<12} {config:<15} solved {result['solved']}/{result['boards']}"
+                  f" timed out {result['timed_out']}"
+                  f"\twall time {result['wall_time']:.3f}\tp90 {result['time']['p90']:.4f}"
+                  f"\tnodes {result['nodes']['total']}", file=sys.stderr)
+    return results
+
+
+def compare(results, baseline, tolerance, min_slowdown=0.05):
+    """ The regressions of the results against the baseline, for the configurations of a corpus in both
+    :param tolerance: the fraction of the baseline wall time a configuration may add before it is a regression
+    :param min_slowdown: seconds a configuration may always add, so the noise of short runs is not a regression
+    :return: list of messages, empty if there is no regression
+    """
+    regressions = []
+    for limit in ("boards_limit", "time_limit", "max_nodes"):
+        if results.get(limit) != baseline.get(limit):
+            regressions.append(f"the baseline ran with {limit} {baseline.get(limit)}, not {results.get(limit)}")
+    if regressions:
+        return regressions
+
+    for corpus, configs in results["corpora"].items():
+        for config, result in configs.items():
+            base = baseline["corpora"].get(corpus, dict()).get(config)
+            if base is None:
+                continue
+            name = f"{corpus} {config}"
+            if result["solved"] < base["solved"]:
+                regressions.append(f"{name}: solved {result['solved']} boards, the baseline {base['solved']}")
+            if result.get("timed_out", 0) > base.get("timed_out", 0):
+                regressions.append(f"{name}: {result['timed_out']} boards timed out, the baseline"
+                                   f" {base.get('timed_out', 0)}")
+            if result["nodes"]["total"] > base["nodes"]["total"]:
+                regressions.append(f"{name}: {result['nodes']['total']} nodes, the baseline"
+                                   f" {base['nodes']['total']}")
+            if result["wall_time"] > max(base["wall_time"] * (1 + tolerance), base["wall_time"] + min_slowdown):
+                regressions.append(f"{name}: wall time {result['wall_time']:.3f}, the baseline"
+                                   f" {base['wall_time']:.3f}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the solvers over the corpora")
+    parser.add_argument("--corpora", nargs="+", default=CORPORA, help="names of files of sudoku_boards_txt")
+    parser.add_argument("--configs", nargs="+", default=CONFIGS,
+                        help="solver names, for example bk_arc_fc_mrv, bk, lr, dlx")
+    parser.add_argument("--boards", type=int, default=None, help="solve only the first boards of each corpus")
+    parser.add_argument("--time-limit", type=float, default=TIME_LIMIT, help="seconds for each board, 0 for no limit")
+    parser.add_argument("--max-nodes", type=int, default=MAX_NODES,
+                        help="nodes of the search of each board, 0 for no limit")
+    parser.add_argument("--output", default="benchmark.json", help="file of the results")
+    parser.add_argument("--baseline", help="results of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="fraction of the baseline wall time allowed before a slowdown is a regression")
+    parser.add_argument("--min-slowdown", type=float, default=0.05,
+                        help="seconds of slowdown always allowed, for the noise of short runs")
+    args = parser.parse_args(argv)
+
+    results = run(args.corpora, args.configs, args.boards, time_limit=args.time_limit or None,
+                  max_nodes=args.max_nodes or None)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.min_slowdown)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print(f"No regression against {args.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,336 @@
+"""
+    Sources of boards for the solvers, for corpora too big to be loaded into memory.
+
+    A corpus is a text file with one board in a line (n^2 chars, 0 for an empty cell). The solvers take any
+    iterable of such lines, so a corpus can be given as:
+        read_boards(path):  a generator of the boards, read from the file one at a time
+        BoardFile(path):    the file mapped into memory (mmap) with an index of the offsets of its boards,
+                            so board number n is found in O(1) - BoardFile(path)[n - 1]
+
+    The index is kept next to the corpus in a sidecar file (path + ".idx"), built on the first use of the corpus
+    and rebuilt when the corpus changes:
+
+                header:   "SUDOKIDX", size of the corpus, modification time of the corpus (nanoseconds)
+                offsets:  the offset of the first char of every board, 8 bytes each
+
+    Empty lines are not boards, so the boards are numbered the same way ReportScheduler numbers them.
+
+    A corpus can also be packed into a binary file (pack_corpus), read with PackedBoardFile. Every board is a
+    record of the same length, so board n is at a known offset and no index is needed:
+
+                header:   "SUDOKPAK", box size, bits of a cell (4, 8 or 16), number of boards
+                records:  the cells of each board, 0 for an empty cell and k for the k-th value of
+                          CUtil.generate_tokens (see CUtil.parse_line), two cells in a byte (high nibble first)
+                          for boards of up to 9 values, a byte for each cell for boards of up to 255 values, and
+                          two bytes (little endian) for each cell for bigger boards
+
+    A board is read back as CUtil.format_line writes it - chars up to 25x25, tokens separated by spaces for
+    bigger boards.
+
+    A 9x9 board takes 41 bytes instead of 82. A pool of processes gets ranges of board numbers of a packed
+    corpus instead of the boards, and every process reads its boards from its own map of the file.
+"""
+import itertools
+import mmap
+import os
+import random
+import struct
+import sys
+from array import array
+from collections.abc import Sized
+from concurrent.futures import ProcessPoolExecutor
+
+from backtraking.CUtil import CUtil, VALUE_CHARS
+
+
+def read_boards(path):
+    """ A generator of the boards of a corpus, read one at a time
+    :param path: file in format n^2 chars in a row
+    :return: every board of the file, without the trailing "\n"
+    """
+    with open(path) as fp:
+        for line in fp:
+            board = line.strip()
+            if board:
+                yield board
+
+
+def count_label(boards):
+    """ The number of boards for the messages of the solvers, which may get a stream of unknown length
+    """
+    if isinstance(boards, Sized):
+        return len(boards)
+    return "the"
+
+
+def batched(boards, size):
+    """ The boards in lists of size boards (the last one may be shorter), read from the iterable as needed
+    """
+    boards = iter(boards)
+    while True:
+        batch = list(itertools.islice(boards, size))
+        if not batch:
+            return
+        yield batch
+
+
+def map_boards(function, boards, workers=1, window=4096):
+    """ map(function, boards) in a pool of processes when workers is not 1, in the order of the boards.
+    The boards are handed to the pool a window at a time, so a stream of boards is never loaded whole.
+    :param workers: number of processes, None for one per core
+    """
+    if workers == 1:
+        yield from map(function, boards)
+        return
+
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        if isinstance(boards, PackedBoardFile):
+            # the processes read the boards from the file, only the ranges of board numbers are sent
+            step = max(1, min(window, len(boards) // (4 * workers)))
+            ranges = ((boards.path, first, min(first + step, len(boards))) for first in range(0, len(boards), step))
+            for part in batched(ranges, 4 * workers):
+                for results in pool.map(_map_packed_range, itertools.repeat(function), part):
+                    yield from results
+            return
+
+        for part in batched(boards, window):
+            yield from pool.map(function, part, chunksize=max(1, len(part) // (4 * workers)))
+
+
+def _map_packed_range(function, board_range):
+    path, start, stop = board_range
+    boards = PackedBoardFile.get(path)
+    return [function(boards[index]) for index in range(start, stop)]
+
+
+def open_corpus(path):
+    """ The boards of a corpus file - a PackedBoardFile for a packed corpus, otherwise a BoardFile
+    """
+    with open(path, 'rb') as fp:
+        packed = fp.read(len(PackedBoardFile.MAGIC)) == PackedBoardFile.MAGIC
+    return PackedBoardFile(path) if packed else BoardFile(path)
+
+
+def pack_corpus(text_path, packed_path):
+    """ Convert a text corpus to the packed format, the boards are read and written one at a time
+    :param text_path: file of a board in a line, n^2 chars or tokens (see CUtil.parse_line), all the boards of
+                      the same size
+    :param packed_path: the packed file
+    :return: the number of boards
+    """
+    count = 0
+    with open(packed_path, 'wb') as out:
+        out.write(PackedBoardFile.HEADER.pack(PackedBoardFile.MAGIC, 0, 0, 0))
+        box_size = None
+        for board in read_boards(text_path):
+            cells, board_box_size = CUtil.parse_line(board)
+            if box_size is None:
+                box_size = board_box_size
+                bits = PackedBoardFile.cell_bits(box_size)
+            if board_box_size != box_size:
+                raise ValueError(f"Board number {count + 1} of {text_path} is not of the size of the first board")
+            out.write(PackedBoardFile.encode(cells, bits))
+            count += 1
+
+        if box_size is not None:
+            out.seek(0)
+            out.write(PackedBoardFile.HEADER.pack(PackedBoardFile.MAGIC, box_size, bits, count))
+    return count
+
+
+class BoardFile:
+    """ The boards of a corpus, mapped into memory, with O(1) access to each board by its number
+    """
+    MAGIC = b"SUDOKIDX"
+    HEADER = struct.Struct("<8sQQ")
+    OFFSET = struct.Struct("<Q")
+
+    def __init__(self, path, index_path=None):
+        """
+        :param path: file in format n^2 chars in a row
+        :param index_path: the sidecar index file, path + ".idx" by default
+        """
+        self.path = path
+        self.index_path = index_path if index_path is not None else path + ".idx"
+        self.__file = open(path, 'rb')
+        stat = os.fstat(self.__file.fileno())
+        self.__key = (stat.st_size, stat.st_mtime_ns)
+        # an empty file can not be mapped
+        self.data = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ) if stat.st_size else b""
+        self.offsets = self.__load_index()
+
+    def __load_index(self):
+        """ The offsets of the boards, as a view on the index file (or in memory if it can not be written)
+        """
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'rb') as fp:
+                header = fp.read(BoardFile.HEADER.size)
+                if len(header) == BoardFile.HEADER.size:
+                    magic, size, mtime = BoardFile.HEADER.unpack(header)
+                    if magic == BoardFile.MAGIC and (size, mtime) == self.__key:
+                        fp.seek(0, os.SEEK_END)
+                        if fp.tell() > BoardFile.HEADER.size:
+                            index = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+                            return memoryview(index)[BoardFile.HEADER.size:].cast('Q')
+                        return memoryview(b"").cast('Q')
+
+        offsets = self.__scan()
+        try:
+            with open(self.index_path, 'wb') as fp:
+                fp.write(BoardFile.HEADER.pack(BoardFile.MAGIC, *self.__key))
+                fp.write(offsets)
+        except OSError:
+            pass  # a read only directory, the index is kept in memory only
+        return memoryview(offsets).cast('Q')
+
+    def __scan(self):
+        offsets = bytearray()
+        data = self.data
+        start = 0
+        while start < len(data):
+            end = data.find(b"\n", start)
+            if end == -1:
+                end = len(data)
+            if data[start:end].strip():
+                offsets += BoardFile.OFFSET.pack(start)
+            start = end + 1
+        return offsets
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        """ The board at index (board number - 1), without the trailing "\n"
+        """
+        start = self.offsets[index]
+        end = self.data.find(b"\n", start)
+        if end == -1:
+            end = len(self.data)
+        return self.data[start:end].decode("ascii").strip()
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def random_board(self):
+        return self[random.randrange(len(self))]
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class PackedBoardFile:
+    """ The boards of a packed corpus (see pack_corpus), mapped into memory
+    """
+    MAGIC = b"SUDOKPAK"
+    HEADER = struct.Struct("<8sBB6xQ")
+    __files = dict()  # path -> PackedBoardFile, opened once in each process
+
+    def __init__(self, path):
+        self.path = path
+        self.__file = open(path, 'rb')
+        self.data = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.box_size, self.bits, self.count = PackedBoardFile.HEADER.unpack_from(self.data)
+        if magic != PackedBoardFile.MAGIC:
+            raise ValueError(f"{path} is not a packed corpus")
+
+        self.number_of_cells = self.box_size ** 4
+        self.record_size = (self.number_of_cells * self.bits + 7) // 8
+        # the value chars of a board in a nibble are its codes (0 - 9), so they are the hex digits of the record,
+        # and the records of bytes of a board with a char for each value are translated to the chars
+        self.__decode = None
+        if self.count and self.bits == 8 and self.box_size ** 2 <= len(VALUE_CHARS):
+            values = CUtil.generate_values(self.box_size)
+            self.__decode = str.maketrans({code: value for code, value in enumerate("0" + values)})
+
+    # Returns the file of the path, opening it on the first request only
+    @staticmethod
+    def get(path):
+        boards = PackedBoardFile.__files.get(path)
+        if boards is None:
+            boards = PackedBoardFile(path)
+            PackedBoardFile.__files[path] = boards
+        return boards
+
+    @staticmethod
+    def cell_bits(box_size):
+        number_of_values = box_size ** 2
+        if number_of_values <= 9:
+            return 4
+        return 8 if number_of_values <= 255 else 16
+
+    # The record of the values of the cells of a board (see CUtil.parse_line)
+    @staticmethod
+    def encode(cells, bits):
+        if bits == 4:
+            cells = cells + [0]  # pad an odd number of cells to a full byte
+            return bytes(cells[i] << 4 | cells[i + 1] for i in range(0, len(cells) - 1, 2))
+        if bits == 8:
+            return bytes(cells)
+        record = array('H', cells)
+        if sys.byteorder == 'big':
+            record.byteswap()
+        return record.tobytes()
+
+    def records(self, start, stop):
+        """ The records of the boards start..stop-1, a view of the file (nothing is copied)
+        """
+        offset = PackedBoardFile.HEADER.size + start * self.record_size
+        return memoryview(self.data)[offset:offset + (stop - start) * self.record_size]
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        """ The board at index (board number - 1), as a line of n^2 chars or tokens (see CUtil.format_line)
+        """
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("board index out of range")
+        offset = PackedBoardFile.HEADER.size + index * self.record_size
+        record = self.data[offset:offset + self.record_size]
+        if self.bits == 4:
+            return record.hex()[:self.number_of_cells]
+        if self.__decode is not None:
+            return record.decode("latin-1").translate(self.__decode)
+        if self.bits == 8:
+            return CUtil.format_line(record, self.box_size)
+        cells = array('H', record)
+        if sys.byteorder == 'big':
+            cells.byteswap()
+        return CUtil.format_line(cells, self.box_size)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def random_board(self):
+        return self[random.randrange(len(self))]
+
+    def close(self):
+        self.data.close()
+        self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+if __name__ == '__main__':
+    # python BoardSource.py corpus.txt corpus.pak
+    if len(sys.argv) != 3:
+        print("usage: python BoardSource.py <text corpus> <packed corpus>")
+        sys.exit(2)
+    print(f"Packed {pack_corpus(sys.argv[1], sys.argv[2])} boards into {sys.argv[2]}")
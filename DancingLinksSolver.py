@@ -0,0 +1,250 @@
+# https://arxiv.org/abs/cs/0011047 - Donald Knuth, Dancing Links
+# https://en.wikipedia.org/wiki/Exact_cover#Sudoku
+
+import time
+from BoardSource import count_label
+from backtraking.CUtil import CUtil
+from BacktrackSolver import BacktrackingSolver
+
+
+class ExactCoverMatrix:
+    """ The exact cover matrix of a sudoku, as the circular doubly linked lists of Dancing Links.
+
+    Every choice (row r, column c, value v) is a row of the matrix with 4 nodes, one in each constraint column:
+        cell:   the cell (r, c) has a value             column r * size + c
+        row:    the row r has the value v                column size^2 + r * size + v
+        column: the column c has the value v             column 2 * size^2 + c * size + v
+        grid:   the grid of (r, c) has the value v       column 3 * size^2 + grid * size + v
+
+    The nodes are numbers - positions in the arrays left, right, up, down (the links) and column (the header
+    of the node). Node 0 is the root, nodes 1..columns are the column headers and after them the nodes of the
+    choices, 4 consecutive nodes for each choice. The links of an empty matrix depend only on the size, so they
+    are built once per size and copied for every board.
+    """
+    __templates = dict()  # size -> the links of the full matrix
+
+    def __init__(self, size):
+        template = ExactCoverMatrix.__templates.get(size)
+        if template is None:
+            template = ExactCoverMatrix.__build(size)
+            ExactCoverMatrix.__templates[size] = template
+        left, right, up, down, column, count = template
+
+        self.size = size
+        self.number_of_columns = 4 * size * size
+        self.left = list(left)
+        self.right = list(right)
+        self.up = list(up)
+        self.down = list(down)
+        self.column = column  # never changes, shared by every board
+        self.count = list(count)  # number of nodes in each column
+
+    @staticmethod
+    def __build(size):
+        grid_size = int(size ** 0.5)
+        number_of_columns = 4 * size * size
+        first_node = number_of_columns + 1
+        number_of_nodes = first_node + 4 * size ** 3
+
+        left = [0] * number_of_nodes
+        right = [0] * number_of_nodes
+        up = list(range(number_of_nodes))
+        down = list(range(number_of_nodes))
+        column = [0] * number_of_nodes
+        count = [0] * (number_of_columns + 1)
+
+        # the root and the headers in one horizontal list
+        for header in range(number_of_columns + 1):
+            left[header] = header - 1 if header > 0 else number_of_columns
+            right[header] = header + 1 if header < number_of_columns else 0
+            column[header] = header
+
+        node = first_node
+        for r in range(size):
+            for c in range(size):
+                grid = (r // grid_size) * grid_size + c // grid_size
+                for v in range(size):
+                    headers = (1 + r * size + c,
+                               1 + size * size + r * size + v,
+                               1 + 2 * size * size + c * size + v,
+                               1 + 3 * size * size + grid * size + v)
+                    for i, header in enumerate(headers):
+                        left[node + i] = node + (i - 1) % 4
+                        right[node + i] = node + (i + 1) % 4
+                        column[node + i] = header
+                        # append at the bottom of the column
+                        up[node + i] = up[header]
+                        down[node + i] = header
+                        down[up[header]] = node + i
+                        up[header] = node + i
+                        count[header] += 1
+                    node += 4
+
+        return left, right, up, down, column, count
+
+    # The first node of the choice (r, c, v)
+    def node_of(self, r, c, v):
+        return self.number_of_columns + 1 + 4 * ((r * self.size + c) * self.size + v)
+
+    # The (r, c, v) of the choice the node belongs to
+    def choice_of(self, node):
+        choice = (node - self.number_of_columns - 1) // 4
+        cell, v = divmod(choice, self.size)
+        r, c = divmod(cell, self.size)
+        return r, c, v
+
+    def cover(self, header):
+        left, right, up, down, column, count = self.left, self.right, self.up, self.down, self.column, self.count
+        right[left[header]] = right[header]
+        left[right[header]] = left[header]
+        i = down[header]
+        while i != header:
+            j = right[i]
+            while j != i:
+                down[up[j]] = down[j]
+                up[down[j]] = up[j]
+                count[column[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    def uncover(self, header):
+        left, right, up, down, column, count = self.left, self.right, self.up, self.down, self.column, self.count
+        i = up[header]
+        while i != header:
+            j = left[i]
+            while j != i:
+                count[column[j]] += 1
+                down[up[j]] = j
+                up[down[j]] = j
+                j = left[j]
+            i = up[i]
+        right[left[header]] = header
+        left[right[header]] = header
+
+    # Take the choice into the solution: cover the columns of its nodes
+    # returns False if one of its columns is already covered by another choice
+    def select(self, node):
+        j = node
+        while True:
+            header = self.column[j]
+            if self.right[self.left[header]] != header:
+                return False
+            self.cover(header)
+            j = self.right[j]
+            if j == node:
+                return True
+
+    def search(self):
+        """ Algorithm X: cover the column with the fewest nodes, try each of its choices and backtrack when
+        a column has no choice left. The search keeps its own stack of choices instead of recursing.
+        :return: the nodes of the chosen choices or None if there is no exact cover, and the number of
+                 choices that were taken back
+        """
+        left, right, down, column, count = self.left, self.right, self.down, self.column, self.count
+        chosen = []
+        backtracks = 0
+        while True:
+            if right[0] == 0:
+                return chosen, backtracks
+
+            # the column with the minimum number of choices
+            header = right[0]
+            best = header
+            while header != 0:
+                if count[header] < count[best]:
+                    best = header
+                    if count[best] <= 1:
+                        break
+                header = right[header]
+
+            self.cover(best)
+            node = down[best]
+            while node == best:
+                # no choice left in the column, take back the last choice and try the next one of its column
+                self.uncover(best)
+                if not chosen:
+                    return None, backtracks
+                node = chosen.pop()
+                best = column[node]
+                j = left[node]
+                while j != node:
+                    self.uncover(column[j])
+                    j = left[j]
+                node = down[node]
+                backtracks += 1
+
+            chosen.append(node)
+            j = right[node]
+            while j != node:
+                self.cover(column[j])
+                j = right[j]
+
+
+class DancingLinksSolver:
+    def __init__(self, boards, print_to_screen=True, print_to_file=None):
+        self.boards = boards
+        self.print_to_screen = print_to_screen
+        self.print_to_file = print_to_file
+
+    def __str__(self):
+        return "Dancing Links Solver"
+
+    def solve(self):
+        """ Solving the board as an exact cover problem with Dancing Links
+        :return: the number of boards solved and the number of boards
+        """
+        if self.print_to_screen:
+            print(f"\nStart solve {count_label(self.boards)} boards with Solver {self.__str__()}\n")
+        success_counter = 0
+        board_counter = 0
+        for board_number, line_board in enumerate(self.boards):
+            board_counter += 1
+            start = time.time()
+            board = line_board.strip()  # strip the trailing "\n"
+            solution, backtrack_count = self.solve_board(board)
+            end = time.time()
+
+            if solution is not None:
+                if self.print_to_file is not None:
+                    self.print_to_file.write(f"{board_number + 1},{backtrack_count},{end - start}\n")
+                print(f" Board number {board_number + 1} solve successfully using {self.__str__()},"
+                      f" after {backtrack_count} attempts and time :{end - start}")
+                if self.print_to_screen:
+                    grid_size = int(round(len(solution) ** 0.25))
+                    BacktrackingSolver.print_board(solution, grid_size)
+                success_counter += 1
+            else:
+                if self.print_to_file is not None:
+                    self.print_to_file.write(f"{board_number + 1}, -1, {end - start} \n")
+                print(f"\n Board number {board_number + 1} failed, using {self.__str__()}")
+
+        return success_counter, board_counter
+
+    @staticmethod
+    def solve_board(board):
+        """
+        :param board: Sudoku board - a line of n^2 chars or tokens (see CUtil.parse_line)
+        :return: the solved board as a list of strings (None if there is no solution) and the number of
+                 backtracks
+        """
+        cells, grid_size = CUtil.parse_line(board)
+        size = grid_size * grid_size
+        values = CUtil.generate_tokens(grid_size)
+        matrix = ExactCoverMatrix(size)
+
+        # the givens are chosen before the search
+        for i, cell in enumerate(cells):
+            if cell != 0:
+                r, c = divmod(i, size)
+                if not matrix.select(matrix.node_of(r, c, cell - 1)):
+                    return None, 0
+
+        chosen, backtrack_count = matrix.search()
+        if chosen is None:
+            return None, backtrack_count
+
+        solution = [values[cell - 1] if cell != 0 else None for cell in cells]
+        for node in chosen:
+            r, c, v = matrix.choice_of(node)
+            solution[r * size + c] = values[v]
+        return solution, backtrack_count
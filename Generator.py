@@ -0,0 +1,233 @@
+"""
+    A generator of new boards, built on the backtracking engine, rated by the measures the solvers report.
+
+    A board is made in three steps:
+        full_grid:      the boxes of the main diagonal (which share no row or column) get random permutations of
+                        the values, and the backtracking search with propagation fills the rest of the grid
+        remove_clues:   the cells are emptied one at a time in a random order, a cell is emptied only if the board
+                        keeps a single solution - since the board had one, that is the case when no solution has
+                        another value in the cell, a search for a single solution (see still_unique)
+        rate:           the board is rated by what solves it - AC-3 alone, the singles of Propagation, all the
+                        rules of Propagation or the search - and by the backtracks of the search (forward checking
+                        and MRV, as bk_fc_mrv of the reports)
+
+    The boards are minimal - every clue left is needed for the single solution - but for the clues whose check
+    runs out of nodes (CHECK_NODES), which are kept. With variants every board made also gives boards of the same
+    class under the symmetries of sudoku (see shuffle_board) - a relabeling of the values, an order of the bands,
+    stacks, rows and columns and a transposition - which keep a single solution and cost only their rating, so
+    more boards are made a minute.
+
+    The boards are written in the format of the corpora, one board in a line, as they are made, and the ratings
+    in the format of the output files of the solvers, one line for each board:
+
+                board number,difficulty,backtracks,arc consistency solves it (0/1),propagation steps
+
+        python Generator.py --count 1000 --workers 0 --output new_boards.txt --ratings new_boards_ratings.txt
+        python Generator.py --count 100 --difficulty expert --variants 20 --output hard_new.txt
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+from functools import partial
+
+import BacktrackSolver as BkSolver
+from BoardSource import map_boards
+from backtraking.ArcConsistency import ArcConsistency
+from backtraking.BackTrack import BackTracking
+from backtraking.CUtil import CUtil
+from backtraking.Constraint import Constraint
+from backtraking.Propagation import Propagation
+from backtraking.Topology import Topology
+
+# The difficulties of the boards, from the easiest: what solves the board
+EASY = "easy"  # AC-3 alone
+MEDIUM = "medium"  # the naked and hidden singles of Propagation
+HARD = "hard"  # all the rules of Propagation
+EXPERT = "expert"  # the backtracking search
+DIFFICULTIES = (EASY, MEDIUM, HARD, EXPERT)
+
+SINGLES = (Propagation.NAKED_SINGLES, Propagation.HIDDEN_SINGLES)
+
+# The nodes of the search of a check of remove_clues: the few checks that need more (on the boards bigger than 9x9)
+# keep their clue instead of taking most of the time of the board
+CHECK_NODES = 2000
+# The nodes of the search that rates a board, a board that needs more is rated with BacktrackSolver.TIMED_OUT
+RATE_NODES = 20000
+
+
+def full_grid(box_size, rng):
+    """ A random solved grid
+    :param rng: random.Random of the grid
+    :return: the values of the cells as numbers (see CUtil.parse_line)
+    """
+    board_size = box_size * box_size
+    cells = [0] * (board_size * board_size)
+    for box in range(box_size):
+        values = list(range(1, board_size + 1))
+        rng.shuffle(values)
+        for position, value in enumerate(values):
+            row, column = divmod(position, box_size)
+            cells[(box * box_size + row) * board_size + box * box_size + column] = value
+
+    constraint = Constraint(CUtil.generate_board(cells, box_size, bitmask=True), Topology.get(box_size), True)
+    Propagation(constraint, SINGLES).propagate()
+    solve, _ = BkSolver.solve_using_backtrack(constraint, forward_check=True, mrv=True, degree=False)
+    return [mask.bit_length() for mask in solve]
+
+
+def still_unique(cells, box_size, cell, value, max_nodes=None):
+    """ Whether a board that has a single solution, with value in the cell, keeps it when the cell is emptied
+    :param cells: the values of the cells as numbers, the cell already emptied (0)
+    :param max_nodes: nodes of the search, None for no limit
+    :return: True if no solution has another value in the cell, False if one has or the search gave up
+    """
+    topology = Topology.get(box_size)
+    # the givens force the value: the cell is a naked single, or a hidden single of one of its units
+    if len({cells[peer] for peer in topology.peers[cell]} - {0}) == box_size * box_size - 1:
+        return True
+    for unit in topology.cell_units[cell]:
+        if all(cells[other] or any(cells[peer] == value for peer in topology.peers[other])
+               for other in topology.units[unit] if other != cell):
+            return True
+
+    board = CUtil.generate_board(cells, box_size, bitmask=True)
+    board[cell] &= ~(1 << (value - 1))
+    constraint = Constraint(board, topology, True)
+    # the singles are cheap at every node of a search this short, the scans of the other rules are not
+    if not Propagation(constraint, SINGLES).propagate():
+        return True
+    back_track = BackTracking(forward_check=True, max_nodes=max_nodes)
+    return back_track.count_solutions(constraint, limit=1) == 0 and not back_track.timed_out
+
+
+def remove_clues(grid, box_size, rng, max_nodes=CHECK_NODES):
+    """ A minimal board of a solved grid: the cells are emptied in a random order while the board keeps a single
+    solution
+    :param max_nodes: nodes of the search of every check, a cell whose check gives up keeps its clue (so the
+                      board may not be minimal), None for no limit
+    :return: the values of the cells of the board as numbers, 0 for an empty cell
+    """
+    cells = list(grid)
+    order = list(range(len(cells)))
+    rng.shuffle(order)
+    for cell in order:
+        value = cells[cell]
+        cells[cell] = 0
+        if not still_unique(cells, box_size, cell, value, max_nodes):
+            cells[cell] = value
+    return cells
+
+
+def shuffle_board(cells, box_size, rng):
+    """ A random board of the class of a board under the symmetries of sudoku, it has a single solution if the
+    board has one
+    """
+    board_size = box_size * box_size
+    labels = list(range(1, board_size + 1))
+    rng.shuffle(labels)
+    labels.insert(0, 0)
+
+    def lines():
+        bands = rng.sample(range(box_size), box_size)
+        return [band * box_size + line for band in bands for line in rng.sample(range(box_size), box_size)]
+
+    rows, columns = lines(), lines()
+    if rng.random() < 0.5:
+        return [labels[cells[column * board_size + row]] for row in rows for column in columns]
+    return [labels[cells[row * board_size + column]] for row in rows for column in columns]
+
+
+def rate(line_board, max_nodes=RATE_NODES):
+    """ The difficulty of a board by the measures the solvers report
+    :param line_board: Sudoku board - a line of n^2 chars or tokens (see CUtil.parse_line)
+    :param max_nodes: nodes of the search, None for no limit
+    :return: the difficulty (see DIFFICULTIES), the backtracks of the search with forward checking and MRV
+             (BacktrackSolver.TIMED_OUT if it needs more than max_nodes nodes), True if AC-3 alone solves the board,
+             and the steps of Propagation with all its rules
+    """
+    board, box_size = BkSolver.parse_board(line_board, bitmask=True)
+    topology = Topology.get(box_size)
+    arc = BkSolver.solve_using_arc_consistency(Constraint(list(board), topology, True)) is not None
+    singles = BkSolver.solve_using_propagation(Constraint(list(board), topology, True), SINGLES) is not None
+    propagation = Propagation(Constraint(list(board), topology, True))
+    rules = propagation.propagate() and ArcConsistency.is_complete(propagation.constraint)
+
+    constraint = Constraint(list(board), topology, True)
+    _, backtracks = BkSolver.solve_using_backtrack(constraint, forward_check=True, mrv=True, degree=False,
+                                                   max_nodes=max_nodes)
+    if arc:
+        difficulty = EASY
+    elif singles:
+        difficulty = MEDIUM
+    elif rules:
+        difficulty = HARD
+    else:
+        difficulty = EXPERT
+    return difficulty, backtracks, arc, propagation.steps
+
+
+def generate_board(number, box_size=3, seed=0, variants=1):
+    """ Make a board and its variants, on its own so the boards can be spread over processes
+    :param number: the number of the board, with the seed it sets the random choices of the board
+    :param variants: number of boards to return - the board made and boards of its class (see shuffle_board)
+    :return: list of (board line, rating) - the rating as returned by rate
+    """
+    rng = random.Random(f"{seed}:{box_size}:{number}")
+    cells = remove_clues(full_grid(box_size, rng), box_size, rng)
+    boards = []
+    for variant in range(variants):
+        line = CUtil.format_line(cells if variant == 0 else shuffle_board(cells, box_size, rng), box_size)
+        boards.append((line, rate(line)))
+    return boards
+
+
+def generate(count=None, box_size=3, seed=0, workers=1, variants=1, difficulty=None, window=None):
+    """ New boards, made as they are read, in a pool of processes when workers is not 1
+    :param count: number of boards, None for no end
+    :param difficulty: only boards of this difficulty (see DIFFICULTIES), None for all of them
+    :param window: number of boards made ahead of the reader, None for 16 for each process
+    :return: a generator of (board line, rating) - the rating as returned by rate
+    """
+    if window is None:
+        window = 16 * (workers or os.cpu_count())
+    made = map_boards(partial(generate_board, box_size=box_size, seed=seed, variants=variants),
+                      itertools.count(), workers, window)
+    boards = itertools.chain.from_iterable(made)
+    if difficulty is not None:
+        boards = (board for board in boards if board[1][0] == difficulty)
+    return itertools.islice(boards, count)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate new boards with a single solution, rated by difficulty")
+    parser.add_argument("--count", type=int, default=100, help="number of boards")
+    parser.add_argument("--box-size", type=int, default=3, help="3 for 9x9 boards, 4 for 16x16")
+    parser.add_argument("--seed", type=int, default=0, help="the same seed makes the same boards")
+    parser.add_argument("--workers", type=int, default=1, help="number of processes, 0 for one per core")
+    parser.add_argument("--variants", type=int, default=1,
+                        help="boards of the class of every board made, 1 for the board made only")
+    parser.add_argument("--difficulty", choices=DIFFICULTIES, help="only boards of this difficulty")
+    parser.add_argument("--output", help="file of the boards, the standard output if not given")
+    parser.add_argument("--ratings", help="file of the ratings of the boards")
+    args = parser.parse_args(argv)
+
+    out = open(args.output, 'w') if args.output else sys.stdout
+    ratings = open(args.ratings, 'w') if args.ratings else None
+    try:
+        boards = generate(args.count, args.box_size, args.seed, args.workers or None, args.variants, args.difficulty)
+        for number, (line, (difficulty, backtracks, arc, steps)) in enumerate(boards, start=1):
+            out.write(line + "\n")
+            if ratings is not None:
+                ratings.write(f"{number},{difficulty},{backtracks},{int(arc)},{steps}\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if ratings is not None:
+            ratings.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
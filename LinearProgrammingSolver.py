@@ -2,59 +2,413 @@
 # https://www.coin-or.org/PuLP/CaseStudies/a_sudoku_problem.html
 # https://coin-or.github.io/pulp/guides/how_to_configure_solvers.html
 
-import time
 from pulp import *
 import pulp as pl
+import time  # after the * import of pulp, which has a name time of its own
 
-import string
+from functools import partial
 
+from BoardSource import batched, count_label, map_boards
+from backtraking.BitDomain import BitDomain
+from backtraking.Budget import Budget
+from backtraking.CUtil import CUtil
+from backtraking.Constraint import Constraint
+from backtraking.Propagation import Propagation
+from backtraking.SolveStats import SolveStats
+from backtraking.Topology import Topology
 
-def data_constraint(board, size):
+
+def data_constraint(cells, size):
     """ A function that returns the constraints of the numbers given in the game board
-    :param board: Sudoku board - a list of char (0 empty, other is value of the cell)
+    :param cells: the values of the cells as numbers (0 empty, see CUtil.parse_line)
     :param size: Size of row / column of the board
-    :return: constraint: list of list that represent the board data in the 3D matrix
+    :return: constraint: list of list that represent the board data in the 3D matrix - row, column and the
+             index of the value
     """
     constraint = []
-    for i, cell in enumerate(board):
-        if cell != '0':
-            row, col = map(str, divmod(i, size))
-            constraint.append([row, col, cell])
+    for i, cell in enumerate(cells):
+        if cell != 0:
+            row, col = divmod(i, size)
+            constraint.append([row, col, cell - 1])
     return constraint
 
 
-def display_sudoku_matrix(matrix, numbers, rows):
-    """ A function that get matrix board sudoku and print to screen
-      :param matrix: Sudoku 3D matrix board
-      :param numbers: An array of all the values ​​that can be as values ​​in the board
-      :param rows: An array of all the numbers of rows and column
+def display_sudoku_solution(solution, size):
+    """ A function that get solved board sudoku and print to screen
+      :param solution: The values of the cells of the board, row by row
+      :param size: Size of row / column of the board
       """
-    size = len(numbers)
     square_root_size = int(size ** 0.5)
-    # Create an array of all the values ​​in which we want to print a border in the table
-    values_sub_grip = [str(i) for i in range(0, size, square_root_size)]
-    for r in rows:
+    # the values of boards bigger than 25x25 are numbers of up to two digits
+    width = max(len(cell) for cell in solution)
+    border = '+' + square_root_size * ((square_root_size * (width + 1) + 1) * '-' + '+')
+    # Create an array of all the values in which we want to print a border in the table
+    values_sub_grip = [i for i in range(0, size, square_root_size)]
+    for r in range(size):
         if r in values_sub_grip:
             # print upper border
-            print('+' + square_root_size * ((square_root_size * 2 + 1) * '-' + '+'))
-        for c in rows:
-            for v in numbers:
-                if value(matrix[r][c][v]) == 1:
-                    if c in values_sub_grip:
-                        print("| ", end="")
-                    print(v + " ", end="")
-                    if c == str(size - 1):
-                        print("|")
-    print('+' + square_root_size * ((square_root_size * 2 + 1) * '-' + '+'))
+            print(border)
+        for c in range(size):
+            if c in values_sub_grip:
+                print("| ", end="")
+            print(solution[r * size + c].rjust(width) + " ", end="")
+            if c == size - 1:
+                print("|")
+    print(border)
+
+
+def solve_model(prob, deadline=None, max_nodes=None):
+    """ Solve the model with CBC, within the time left until the deadline and max_nodes nodes
+    :return: the status of the model - LpStatusOptimal, LpStatusInfeasible, or LpStatusNotSolved when CBC
+             stopped on the limits before it found a solution
+    """
+    time_limit = Budget.seconds_left(deadline)
+    if time_limit == 0:
+        return LpStatusNotSolved
+    prob.solve(pl.PULP_CBC_CMD(msg=False, threads=1, timeLimit=time_limit, maxNodes=max_nodes))
+    if prob.sol_status in (LpSolutionOptimal, LpSolutionIntegerFeasible):
+        # any feasible solution is the solution of a sudoku
+        return LpStatusOptimal
+    if prob.status == LpStatusInfeasible:
+        return LpStatusInfeasible
+    return LpStatusNotSolved
+
+
+class SudokuModel:
+    """ The linear programming model of all the boards of one size.
+
+    The variables and the constraints of rows, columns, values and sub grids depend only on the size of the
+    board, so the model is built once per size (in each process) and shared by every board of that size.
+    A board only fixes the variables of its givens to 1 (their lower bound) before the solve, and frees them
+    after it.
+    """
+    __models = dict()  # size -> SudokuModel
+
+    def __init__(self, size):
+        square_root_size = int(size ** 0.5)
+
+        # Rows, columns and values are numbered from 0, the tokens of the values are only for the solution
+        value_in_board = list(range(size))
+        rows_board = list(range(size))
+        cols_board = rows_board
+
+        # Create sub_grids
+        sub_grids = []
+        for i in range(square_root_size):
+            for j in range(square_root_size):
+                sub_grids += [[(rows_board[square_root_size * i + k], cols_board[square_root_size * j + l])
+                               for k in range(square_root_size) for l in range(square_root_size)]]
+
+        # Definition of the variables, a matrix of 729 three-dimensional cells
+        matrix_choices = LpVariable.dicts("Choice", (rows_board, cols_board, value_in_board), 0, 1, LpInteger)
+
+        # Creating the Problem
+        prob = LpProblem("Sudoku_Problem", LpMinimize)
+
+        # Objective Function, set to 0 since Sudoku doesn't have an optimal solution
+        prob += 0, "Arbitrary Objective Function"
+
+        # Constraint 1: A row should have all the numbers from 1-9 and no number can be repeated (Row constraint)
+        for v in value_in_board:
+            for r in rows_board:
+                prob += lpSum([matrix_choices[r][c][v] for c in cols_board]) == 1, ""
+
+        # Constraint 2: A column should have all the numbers from 1-9 and no number can be repeated (Column constraint)
+        for v in value_in_board:
+            for c in cols_board:
+                prob += lpSum([matrix_choices[r][c][v] for r in rows_board]) == 1, ""
+
+        # Constraint 3: Only one number can be present in a cell (Value constraint)
+        for r in rows_board:
+            for c in cols_board:
+                prob += lpSum([matrix_choices[r][c][v] for v in value_in_board]) == 1, ""
+
+        # Constraint 4: A sub grids should have all the numbers from 1-9 and no number can be repeated (Squares constraints)
+        for v in value_in_board:
+            for s in sub_grids:
+                prob += lpSum([matrix_choices[r][c][v] for (r, c) in s]) == 1, ""
+
+        self.size = size
+        self.tokens = CUtil.generate_tokens(square_root_size)
+        self.value_in_board = value_in_board
+        self.rows_board = rows_board
+        self.matrix_choices = matrix_choices
+        self.prob = prob
+
+    @staticmethod
+    def get(size):
+        model = SudokuModel.__models.get(size)
+        if model is None:
+            model = SudokuModel(size)
+            SudokuModel.__models[size] = model
+        return model
+
+    def solve(self, cells, deadline=None, max_nodes=None):
+        """ Solve the model with the givens of the board
+        :param cells: the values of the cells of the board as numbers (0 empty, see CUtil.parse_line)
+        :return: the values of the cells of the solved board (None if not Optimal) and the status of the model
+                 (see solve_model)
+        """
+        matrix_choices = self.matrix_choices
+        # Constraint 5: Set in matrix the number already given
+        given = [matrix_choices[r][c][v] for r, c, v in data_constraint(cells, self.size)]
+        for variable in given:
+            variable.lowBound = 1
+
+        # Change solver
+        # The problem data is written to an .lp file
+        # prob.writeLP("Sudoku.lp")
+        # solver = pulp.getSolver('CPLEX_CMD')
+        # status = prob.solve(solver=GLPK(msg=False))
+
+        try:
+            status = solve_model(self.prob, deadline, max_nodes)
+        finally:
+            for variable in given:
+                variable.lowBound = 0
+
+        # The status of the solution is printed to the screen
+        # print("Status:", LpStatus[prob.status])
+        if status != LpStatusOptimal:
+            return None, status
+
+        solution = []
+        for r in self.rows_board:
+            for c in self.rows_board:
+                for v in self.value_in_board:
+                    if round(value(matrix_choices[r][c][v])) == 1:
+                        solution.append(self.tokens[v])
+        return solution, status
+
+
+class BoardBlock:
+    """ The variables and the constraints of one board, in a model that can hold the blocks of other boards.
+
+    Every open cell has a variable only for the values left in its domain, and a row, column or sub grid needs a
+    constraint only for the values it still misses. The rules of backtraking.Propagation are applied first, so the
+    cells they solve are no longer variables.
+    """
+    def __init__(self, cells, grid_size, name="", rules=(Propagation.NAKED_SINGLES, Propagation.HIDDEN_SINGLES),
+                 givens=False):
+        """
+        :param cells: the values of the cells of the board as numbers (0 empty, see CUtil.parse_line)
+        :param name: prefix of the names of the variables, unique for each block of a model
+        :param rules: the propagation rules applied before building the block, () for none
+        :param givens: with no rules, leave out only the values of the givens of the peers of every empty cell -
+                       a single pass, the cells left with one value do not remove it from their peers
+        """
+        size = grid_size * grid_size
+        self.size = size
+        self.values = CUtil.generate_tokens(grid_size)
+        self.topology = Topology.get(grid_size)
+        constraint = Constraint(CUtil.generate_board(cells, grid_size, bitmask=True), self.topology, bitmask=True)
+        self.consistent = True
+        self.timed_out = False  # set by solve_blocks when CBC stopped on the budget before solving the block
+        self.propagations = 0
+        if rules:
+            propagation = Propagation(constraint, rules)
+            self.consistent = propagation.propagate()
+            self.propagations = propagation.steps
+        elif givens:
+            self.consistent = self.__remove_givens(cells, constraint)
+        self.removals = len(constraint.trail)
+
+        self.domains = constraint.board
+        self.solution = [self.values[domain.bit_length() - 1] if BitDomain.is_single(domain) else None
+                         for domain in self.domains]
+        self.open_cells = [cell for cell, domain in enumerate(self.domains) if not BitDomain.is_single(domain)]
+
+        # Definition of the variables, one for each candidate of each open cell
+        self.choices = {cell: {v: LpVariable(f"{name}Choice_{cell}_{v}", 0, 1, LpInteger)
+                               for v in range(size) if self.domains[cell] & (1 << v)}
+                        for cell in self.open_cells}
+
+    # Remove the value of every given from the domains of its empty peers, False if a domain runs out of values
+    def __remove_givens(self, cells, constraint):
+        board = constraint.board
+        for cell, given in enumerate(cells):
+            if given == 0:
+                continue
+            mask = 1 << (given - 1)
+            for peer in self.topology.peers[cell]:
+                if cells[peer] == 0 and board[peer] & mask:
+                    if board[peer] == mask:
+                        return False
+                    constraint.reduce(peer, board[peer] & ~mask)
+        return True
+
+    def add_to(self, prob):
+        """ Add the constraints of the board to the model
+        :return: False if the board has no solution without solving (the same value placed twice in a unit)
+        """
+        choices = self.choices
+
+        # Only one number can be present in a cell (Value constraint)
+        for cell in self.open_cells:
+            prob += lpSum(choices[cell].values()) == 1, ""
+
+        # Every row, column and sub grid has each number it still misses exactly once
+        for unit in self.topology.units:
+            placed = 0
+            for cell in unit:
+                if cell not in choices:
+                    if placed & self.domains[cell]:
+                        return False
+                    placed |= self.domains[cell]
+            for v in range(self.size):
+                if not placed & (1 << v):
+                    prob += lpSum([choices[cell][v] for cell in unit
+                                   if cell in choices and v in choices[cell]]) == 1, ""
+        return True
+
+    # The values of the cells of the board, after the model is solved
+    def read_solution(self):
+        solution = list(self.solution)
+        for cell in self.open_cells:
+            for v, variable in self.choices[cell].items():
+                if round(value(variable)) == 1:
+                    solution[cell] = self.values[v]
+        return solution
+
+
+def solve_blocks(blocks, deadline=None, max_nodes=None):
+    """ Solve the blocks of many boards in one model. When the model is infeasible, because of at least one
+    board, the blocks are split in halves and solved again until the boards without a solution are alone.
+    When CBC stops on the deadline or max_nodes, the blocks of the model are marked timed_out.
+    :return: the values of the cells of each solved board, None for a board without a solution
+    """
+    solutions = [None] * len(blocks)
+    to_solve = []
+    prob = LpProblem("Sudoku_Problem", LpMinimize)
+    prob += 0, "Arbitrary Objective Function"
+    for index, block in enumerate(blocks):
+        if not block.consistent or not block.add_to(prob):
+            continue
+        if not block.open_cells:
+            solutions[index] = block.read_solution()
+            continue
+        to_solve.append(index)
+    if not to_solve:
+        return solutions
+
+    status = solve_model(prob, deadline, max_nodes)
+    if status == LpStatusOptimal:
+        for index in to_solve:
+            solutions[index] = blocks[index].read_solution()
+    elif status == LpStatusNotSolved:
+        for index in to_solve:
+            blocks[index].timed_out = True
+    elif len(to_solve) > 1:
+        half = len(to_solve) // 2
+        for part in (to_solve[:half], to_solve[half:]):
+            for index, solution in zip(part, solve_blocks([blocks[index] for index in part], deadline, max_nodes)):
+                solutions[index] = solution
+    return solutions
+
+
+def solve_reduced_board(cells, grid_size, stats=None, deadline=None, max_nodes=None):
+    """ Solve the board with a model of only the candidates left after constraint propagation
+    :param cells: the values of the cells of the board as numbers (0 empty, see CUtil.parse_line)
+    :param stats: SolveStats to fill, or None
+    :return: the values of the cells of the solved board (None if there is no solution) and True if CBC stopped
+             on the limits before it solved the board
+    """
+    with SolveStats.timed(stats, "model"):
+        block = BoardBlock(cells, grid_size)
+    if stats is not None:
+        stats.propagations += block.propagations
+        stats.removals += block.removals
+    with SolveStats.timed(stats, "solve"):
+        return solve_blocks([block], deadline, max_nodes)[0], block.timed_out
+
+
+def solve_batch(line_boards, reduced=False, collect_stats=False, budget=None):
+    """ Solving many boards in one model, one block of variables and constraints for each board
+    :param line_boards: Sudoku boards - lines of n^2 chars or tokens (see CUtil.parse_line)
+    :param reduced: model only the candidates left after propagation (naked and hidden singles), otherwise only
+                    the values of the givens of their peers are left out of the empty cells, in a single pass
+                    (CBC is much slower on many full blocks than on one)
+    :param collect_stats: count the propagation of each board and time the phases of the batch (see SolveStats)
+    :param budget: the limits of each board (see Budget), the batch gets the time and the nodes of all its boards
+    :return: for each board, the values of the cells of the solved board (None if it failed), the time it
+             took, its SolveStats (None when not collected) and True if it timed out - the time and the phases
+             of the batch are shared equally by its boards
+    """
+    start = time.time()
+    deadline, max_nodes = None, None
+    if budget is not None:
+        batch_budget = Budget(budget.time_limit * len(line_boards) if budget.time_limit is not None else None,
+                              budget.max_nodes * len(line_boards) if budget.max_nodes is not None else None,
+                              budget.deadline)
+        deadline, max_nodes = batch_budget.board_deadline(), batch_budget.max_nodes
+    batch_stats = SolveStats() if collect_stats else None
+    rules = (Propagation.NAKED_SINGLES, Propagation.HIDDEN_SINGLES) if reduced else ()
+    with SolveStats.timed(batch_stats, "model"):
+        blocks = [BoardBlock(*CUtil.parse_line(line_board), f"B{index}_", rules, givens=not reduced)
+                  for index, line_board in enumerate(line_boards)]
+    with SolveStats.timed(batch_stats, "solve"):
+        solutions = solve_blocks(blocks, deadline, max_nodes)
+    board_time = (time.time() - start) / len(line_boards)
+
+    results = []
+    for block, solution in zip(blocks, solutions):
+        stats = None
+        if collect_stats:
+            stats = SolveStats()
+            stats.propagations = block.propagations
+            stats.removals = block.removals
+            stats.phases = {name: seconds / len(blocks) for name, seconds in batch_stats.phases.items()}
+        results.append((solution, board_time, stats, block.timed_out))
+    return results
+
+
+def solve_board(line_board, reduced=False, collect_stats=False, budget=None):
+    """ Solving one board using linear programming, on its own so the boards can be spread over processes
+    :param line_board: Sudoku board - a line of n^2 chars or tokens (see CUtil.parse_line)
+    :param reduced: solve a model of only the candidates left after propagation instead of the full model
+    :param collect_stats: time the phases of the board - parse, model and solve (see SolveStats)
+    :param budget: the limits of the board (see Budget), None for no limit
+    :return: the values of the cells of the solved board (None if not Optimal), the time it took, the
+             SolveStats of the board (None when not collected) and True if CBC stopped on the budget
+    """
+    start = time.time()
+    stats = SolveStats() if collect_stats else None
+    deadline, max_nodes = None, None
+    if budget is not None:
+        deadline, max_nodes = budget.board_deadline(), budget.max_nodes
+    with SolveStats.timed(stats, "parse"):
+        cells, grid_size = CUtil.parse_line(line_board)
+
+    if reduced:
+        solution, timed_out = solve_reduced_board(cells, grid_size, stats, deadline, max_nodes)
+    else:
+        with SolveStats.timed(stats, "model"):
+            model = SudokuModel.get(grid_size * grid_size)
+        with SolveStats.timed(stats, "solve"):
+            solution, status = model.solve(cells, deadline, max_nodes)
+        timed_out = status == LpStatusNotSolved
+    end = time.time()
+    return solution, end - start, stats, timed_out
 
 
 class LinearProgrammingSolver:
-    def __init__(self, boards, print_to_screen=True, print_to_file=None):
+    def __init__(self, boards, print_to_screen=True, print_to_file=None, workers=1, reduced=False, batch_size=1,
+                 stats_hook=None, time_limit=None, max_nodes=None, deadline=None, cache=None):
         self.boards = boards
         self.print_to_screen = print_to_screen
         self.print_to_file = print_to_file
+        self.workers = workers  # number of processes solving boards, None for one per core
+        self.reduced = reduced  # model only the candidates left after constraint propagation
+        self.batch_size = batch_size  # number of boards solved together in one model
+        self.stats_hook = stats_hook  # called with the board number and the SolveStats of every board, or None
+        self.time_limit = time_limit  # seconds for each board, None for no limit
+        self.max_nodes = max_nodes  # branch and bound nodes of each board, None for no limit
+        self.deadline = deadline  # seconds for all the boards of a solve, None for no limit
+        self.cache = cache  # a SolutionCache of the solved boards, or None to solve every board
 
     def __str__(self):
+        if self.reduced:
+            return "Linear Programming Solver, using Propagation"
         return "Linear Programming Solver"
 
     def solve(self):
@@ -62,101 +416,62 @@ class LinearProgrammingSolver:
         :return True if Optimal - succeeded
         """
         if self.print_to_screen:
-            print(f"\nStart solve {len(self.boards)} boards with Solver {self.__str__()}\n")
+            print(f"\nStart solve {count_label(self.boards)} boards with Solver {self.__str__()}\n")
         success_counter = 0
-        for board_number, line_board in enumerate(self.boards):
-            start = time.time()
-            board = line_board.strip()  # strip the trailing "\n"
-            size = int(len(board) ** 0.5)
-
-            # The default values
-            value_in_board = [str(i) for i in range(1, 10)]
-            # Add additional values ​​according to the size of the table
-            value_in_board.extend(list(string.ascii_uppercase[0: size - 9]))
-
-            rows_board = [str(i) for i in range(0, size)]
-            cols_board = rows_board
-
-            square_root_size = int(size ** 0.5)
-
-            # Create sub_grids
-            sub_grids = []
-            for i in range(square_root_size):
-                for j in range(square_root_size):
-                    sub_grids += [[(rows_board[square_root_size * i + k], cols_board[square_root_size * j + l])
-                                   for k in range(square_root_size) for l in range(square_root_size)]]
-
-            # Definition of the variables, a matrix of 729 three-dimensional cells
-            matrix_choices = LpVariable.dicts("Choice", (rows_board, cols_board, value_in_board), 0, 1, LpInteger)
-
-            # Creating the Problem
-            prob = LpProblem("Sudoku_Problem", LpMinimize)
-
-            # Objective Function, set to 0 since Sudoku doesn't have an optimal solution
-            prob += 0, "Arbitrary Objective Function"
-
-            # Constraint 1: A row should have all the numbers from 1-9 and no number can be repeated (Row constraint)
-            for v in value_in_board:
-                for r in rows_board:
-                    prob += lpSum([matrix_choices[r][c][v] for c in cols_board]) == 1, ""
-
-            # Constraint 2: A column should have all the numbers from 1-9 and no number can be repeated (Column constraint)
-            for v in value_in_board:
-                for r in rows_board:
-                    prob += lpSum([matrix_choices[r][c][v] for c in cols_board]) == 1, ""
-
-            # Constraint 3: Only one number can be present in a cell (Value constraint)
-            for r in rows_board:
-                for c in cols_board:
-                    prob += lpSum([matrix_choices[r][c][v] for v in value_in_board]) == 1, ""
-
-            # Constraint 4: A sub grids should have all the numbers from 1-9 and no number can be repeated (Squares constraints)
-            for v in value_in_board:
-                for s in sub_grids:
-                    prob += lpSum([matrix_choices[r][c][v] for (r, c) in s]) == 1, ""
-
-            constraint_given = data_constraint(board, size)
-            # Constraint 5: Set in matrix the number already given
-            for constrain in constraint_given:
-                prob += matrix_choices[constrain[0]][constrain[1]][constrain[2]] == 1, ""
-
-            # Change solver
-            # The problem data is written to an .lp file
-            # prob.writeLP("Sudoku.lp")
-            # solver = pulp.getSolver('CPLEX_CMD')
-            # status = prob.solve(solver=GLPK(msg=False))
-
-            solver = pl.PULP_CBC_CMD(msg=False, threads=1)
-
-            prob.solve(solver)
-            end = time.time()
-
-            # The status of the solution is printed to the screen
-            # print("Status:", LpStatus[prob.status])
-            if prob.status == 1:
+        board_counter = 0
+        for board_number, (solution, elapsed, stats, timed_out) in enumerate(self.solve_boards()):
+            board_counter += 1
+            if self.stats_hook is not None:
+                self.stats_hook(board_number + 1, stats)
+            if solution is not None:
                 if self.print_to_file != None:
                     self.print_to_file.write(
-                    f"{board_number + 1}, {0}, {end - start}\n")
+                    f"{board_number + 1}, {0}, {elapsed}\n")
                 print(f"\n Board number {board_number + 1} solve successfully, using {self.__str__()}")
                 if self.print_to_screen:
-                    display_sudoku_matrix(matrix_choices, value_in_board, rows_board)
+                    display_sudoku_solution(solution, int(len(solution) ** 0.5))
                 success_counter += 1
+            elif timed_out:
+                if self.print_to_file is not None:
+                    self.print_to_file.write(f"{board_number + 1}, -2, {elapsed} \n")
+                print(f"\n Board number {board_number + 1} timed out, using {self.__str__()}")
             else:
                 print(f"\n Board number {board_number + 1} failed, using {self.__str__()}")
 
-            # Remove all data
-            del board
-            del matrix_choices
-            del value_in_board
-            del rows_board
-            del prob
-
-        return success_counter, len(self.boards)
-
-
-
-
-
-
-
+        return success_counter, board_counter
 
+    def solve_boards(self):
+        """ Solve the boards, in a pool of processes when workers is not 1
+        :return: the result of solve_board for each board, in the order of the boards
+        """
+        if self.cache is not None:
+            yield from self.cache.solve_boards(self.boards, self.solve_uncached, self.cached_result)
+        else:
+            yield from self.solve_uncached(self.boards)
+
+    def solve_uncached(self, boards):
+        if self.batch_size > 1:
+            batches = batched(boards, self.batch_size)
+            solve_many = partial(solve_batch, reduced=self.reduced, collect_stats=self.stats_hook is not None,
+                                 budget=self.budget())
+            for results in map_boards(solve_many, batches, self.workers, window=64):
+                yield from results
+        else:
+            solve_one = partial(solve_board, reduced=self.reduced, collect_stats=self.stats_hook is not None,
+                                budget=self.budget())
+            yield from map_boards(solve_one, boards, self.workers)
+
+    # The result of solve_board for a board found in the cache
+    def cached_result(self, solution, elapsed):
+        stats = None
+        if self.stats_hook is not None:
+            stats = SolveStats()
+            stats.phases["cache"] = elapsed
+        return solution, elapsed, stats, False
+
+    # The limits of the boards of a solve starting now
+    def budget(self):
+        if self.time_limit is None and self.max_nodes is None and self.deadline is None:
+            return None
+        deadline = time.time() + self.deadline if self.deadline is not None else None
+        return Budget(self.time_limit, self.max_nodes, deadline)
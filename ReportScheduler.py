@@ -0,0 +1,168 @@
+import contextlib
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import BacktrackSolver as BkSolver
+import DancingLinksSolver as DlxSolver
+import LinearProgrammingSolver as LpSolver
+
+
+def create_solver(solver_name, boards, print_to_file):
+    """ A function that returns the solver of a report by its name
+    :param solver_name: "lr", "dlx" or "bk" with the heuristics in the name, for example "bk_arc_fc_mrv"
+    """
+    if solver_name == "lr":
+        return LpSolver.LinearProgrammingSolver(boards, print_to_screen=False, print_to_file=print_to_file)
+    if solver_name == "dlx":
+        return DlxSolver.DancingLinksSolver(boards, print_to_screen=False, print_to_file=print_to_file)
+
+    arc, mrv, fc = False, False, False
+    if "arc" in solver_name:
+        arc = True
+    if "mrv" in solver_name:
+        mrv = True
+    if "fc" in solver_name:
+        fc = True
+    return BkSolver.BacktrackingSolver(boards, print_to_screen=False, arc=arc, forward_check=fc, mrv=mrv,
+                                       print_to_file=print_to_file)
+
+
+def solve_report_board(solver_name, board, board_number):
+    """ Solve one board of a report
+    :return: the line the solver writes for the board, numbered as board_number ("" if it writes nothing)
+    """
+    result = io.StringIO()
+    with contextlib.redirect_stdout(io.StringIO()):
+        create_solver(solver_name, [board], result).solve()
+    line = result.getvalue()
+    if not line:
+        return line
+    # the solver saw a single board, so it numbered it 1
+    return str(board_number) + line[line.index(','):]
+
+
+class ReportScheduler:
+    """ Runs the boards of a report as independent tasks in a pool of processes.
+
+    A report is a set of output files, one for each (sudoku file, solver) pair, with one line for each board.
+    Every finished board is appended to a checkpoint file right away, so a report that is run again only solves
+    the boards that are not in the checkpoints yet. The first line of a checkpoint is the key of its run - the
+    sudoku file with its size and modification time, and the solver name, which sets the configuration of the
+    solver - and a checkpoint of another key (a sudoku file that changed since) is discarded. An output file is
+    written, in the order of the boards, once all of its boards are done - in the same format the solvers write it.
+    """
+    def __init__(self, sudoku_files, solvers, workers=None, checkpoint_dir="report_checkpoints"):
+        """
+        :param sudoku_files: list of (path of the boards file, suffix of the output files)
+        :param solvers: list of solver names (see create_solver)
+        :param workers: number of processes, None for one per core
+        :param checkpoint_dir: directory of the checkpoint files
+        """
+        self.sudoku_files = sudoku_files
+        self.solvers = solvers
+        self.workers = workers
+        self.checkpoint_dir = checkpoint_dir
+
+    def run(self):
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        # output file name -> {board number: line}
+        done = dict()
+        pending = dict()
+        keys = dict()
+        tasks = []
+        for path, suffix in self.sudoku_files:
+            with open(path) as fp:
+                boards = [line for line in fp if line.strip()]
+            for solver_name in self.solvers:
+                output = solver_name + suffix + ".txt"
+                keys[output] = self.__checkpoint_key(path, solver_name)
+                done[output] = self.__read_checkpoint(output, keys[output])
+                pending[output] = len(boards) - len(done[output])
+                for board_number, board in enumerate(boards, start=1):
+                    if board_number not in done[output]:
+                        tasks.append((output, solver_name, board, board_number))
+
+        for output in done:
+            if pending[output] == 0:
+                self.__write_output(output, done[output])
+        if not tasks:
+            return
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(solve_report_board, solver_name, board, board_number): (output, board_number)
+                       for output, solver_name, board, board_number in tasks}
+            checkpoints = {output: self.__open_checkpoint(output, keys[output]) for output in done if pending[output]}
+            try:
+                for future in as_completed(futures):
+                    output, board_number = futures[future]
+                    line = future.result()
+                    checkpoints[output].write(json.dumps([board_number, line]) + "\n")
+                    checkpoints[output].flush()
+                    done[output][board_number] = line
+                    pending[output] -= 1
+                    if pending[output] == 0:
+                        self.__write_output(output, done[output])
+                        print(f"\tReport {output} is done")
+            finally:
+                for checkpoint in checkpoints.values():
+                    checkpoint.close()
+
+    def __checkpoint_path(self, output):
+        return os.path.join(self.checkpoint_dir, output + ".checkpoint")
+
+    @staticmethod
+    def __checkpoint_key(path, solver_name):
+        """ The run a checkpoint belongs to, its boards are of no use to a run of another key
+        :param path: path of the boards file
+        :param solver_name: the name of the solver, all of its configuration (see create_solver)
+        """
+        stat = os.stat(path)
+        return {"file": os.path.abspath(path), "size": stat.st_size, "mtime": stat.st_mtime, "solver": solver_name}
+
+    def __open_checkpoint(self, output, key):
+        path = self.__checkpoint_path(output)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            checkpoint = open(path, 'w')
+            checkpoint.write(json.dumps(key) + "\n")
+            return checkpoint
+        with open(path, 'rb') as fp:
+            fp.seek(-1, os.SEEK_END)
+            cut_record = fp.read(1) != b"\n"
+        checkpoint = open(path, 'a')
+        if cut_record:
+            # end the record of a run that was stopped in the middle of writing it
+            checkpoint.write("\n")
+        return checkpoint
+
+    def __read_checkpoint(self, output, key):
+        lines = dict()
+        path = self.__checkpoint_path(output)
+        if not os.path.exists(path):
+            return lines
+        with open(path) as fp:
+            try:
+                same_run = json.loads(fp.readline()) == key
+            except ValueError:
+                same_run = False
+            if same_run:
+                records = fp.readlines()
+        if not same_run:
+            # the checkpoint of another sudoku file or solver (or of a run before the key was written)
+            os.remove(path)
+            return lines
+        for record in records:
+                try:
+                    board_number, line = json.loads(record)
+                except ValueError:
+                    # the last record of a run that was stopped in the middle of writing it
+                    continue
+                lines[board_number] = line
+        return lines
+
+    @staticmethod
+    def __write_output(output, lines):
+        with open(output, 'w') as f:
+            for board_number in sorted(lines):
+                f.write(lines[board_number])
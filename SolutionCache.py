@@ -0,0 +1,249 @@
+"""
+    A cache of solved boards that knows the symmetries of sudoku. Two boards that differ only by a relabeling of
+    the values, a transposition, an order of the bands (and of the stacks), or an order of the rows in a band (and
+    of the columns in a stack) have the same solution up to the same change, so a board is looked up by its
+    canonical form:
+
+        canonical_form(board):  the board, changed by one of the symmetries to a form that is the same for
+                                every board of its class, and the change (cells and labels) to map the solution
+                                of the form back to the board
+
+    The form is the smallest relabeled string over the orders of the bands, stacks, rows and columns that agree
+    with counts of the givens that no symmetry changes (and over the transposition). When those counts tie on too
+    many orders, only the first orders are tried, so a few symmetric boards get a form of their own - a miss of
+    the cache, never a wrong solution.
+
+    Solutions are kept in a bounded in-memory LRU, keyed by the board (a repeat of a board is answered without
+    its canonical form) and by the form, and in an optional store on the disk (dbm) keyed by the form, so they
+    are kept between runs:
+
+        with SolutionCache(capacity=4096, path="solutions.db") as cache:
+            LinearProgrammingSolver(boards, cache=cache).solve()
+"""
+import dbm
+import itertools
+import math
+import time
+from collections import OrderedDict
+
+from BoardSource import batched
+from backtraking.CUtil import CUtil
+
+# The most orders of the tied bands, stacks, rows and columns tried for a canonical form, in each orientation
+MAX_ORDERS = 1024
+
+
+def canonical_form(line_board):
+    """ The canonical form of a board under the symmetries of sudoku
+    :param line_board: Sudoku board - a line of n^2 chars or tokens (see CUtil.parse_line)
+    :return: the form (a board line), the cells of the board in the order of the form (form[i] is the value
+             of board[cells[i]] relabeled), the labels - the value of the form of every value of the board, as
+             numbers (see CUtil.parse_line) - and the box size
+    """
+    board, box_size = CUtil.parse_line(line_board)
+    board_size = box_size * box_size
+
+    best = None
+    for transposed in (False, True):
+        if transposed:
+            grid = [board[column * board_size + row] for row in range(board_size) for column in range(board_size)]
+        else:
+            grid = board
+        for rows, columns in _orders(grid, box_size):
+            if transposed:
+                cells = [column * board_size + row for row in rows for column in columns]
+            else:
+                cells = [row * board_size + column for row in rows for column in columns]
+            labels = {0: 0}
+            form = []
+            for cell in cells:
+                label = labels.get(board[cell])
+                if label is None:
+                    label = len(labels)
+                    labels[board[cell]] = label
+                form.append(label)
+            if best is None or form < best[0]:
+                best = (form, cells, labels)
+
+    form, cells, labels = best
+    # the values that are not given take the labels left, in order, so the labels are a permutation
+    missing = iter(range(len(labels), board_size + 1))
+    for value in range(1, board_size + 1):
+        if value not in labels:
+            labels[value] = next(missing)
+    return CUtil.format_line(form, box_size), cells, labels, box_size
+
+
+def _orders(grid, box_size):
+    """ The orders of the rows and the columns of a grid to try for its canonical form. The bands, the rows in a
+    band, the stacks and the columns in a stack are sorted by counts of their givens, and the tied ones are tried
+    in every order (up to MAX_ORDERS orders)
+    """
+    board_size = box_size * box_size
+    row_counts = [0] * board_size
+    column_counts = [0] * board_size
+    for cell, data in enumerate(grid):
+        if data != 0:
+            row, column = divmod(cell, board_size)
+            row_counts[row] += 1
+            column_counts[column] += 1
+
+    # a row is known by its givens and the givens of the columns it crosses on them, a column the same way
+    row_keys = [(row_counts[row], sorted(column_counts[column] for column in range(board_size)
+                                         if grid[row * board_size + column] != 0))
+                for row in range(board_size)]
+    column_keys = [(column_counts[column], sorted(row_counts[row] for row in range(board_size)
+                                                  if grid[row * board_size + column] != 0))
+                   for column in range(board_size)]
+
+    row_groups = _line_orders(row_keys, box_size)
+    column_groups = _line_orders(column_keys, box_size)
+    groups = row_groups + column_groups
+    if math.prod(len(orders) for orders in groups) > MAX_ORDERS:
+        groups = [orders[:1] for orders in groups]
+    for choice in itertools.product(*groups):
+        yield _lines(choice[:len(row_groups)]), _lines(choice[len(row_groups):])
+
+
+def _line_orders(keys, box_size):
+    """ The orders of the bands and of the lines in each band that keep them sorted by their keys, the tied
+    ones in every order
+    :return: list of groups - the orders of the bands, then the orders of the lines of each band
+    """
+    bands = [range(band * box_size, (band + 1) * box_size) for band in range(box_size)]
+    band_keys = [sorted(keys[line] for line in band) for band in bands]
+    groups = [_sorted_orders(range(box_size), band_keys)]
+    groups.extend(_sorted_orders(band, keys) for band in bands)
+    return groups
+
+
+def _sorted_orders(items, keys):
+    ordered = sorted(items, key=lambda item: keys[item])
+    ties = [list(itertools.permutations(tied))
+            for _, tied in itertools.groupby(ordered, key=lambda item: keys[item])]
+    return [sum(order, ()) for order in itertools.product(*ties)]
+
+
+def _lines(choice):
+    """ The lines of a choice of an order of the bands and an order of the lines of each band
+    """
+    band_order, line_orders = choice[0], choice[1:]
+    return [line for band in band_order for line in line_orders[band]]
+
+
+class SolutionCache:
+    """ Solutions of boards, looked up by their canonical form
+    """
+    def __init__(self, capacity=4096, path=None):
+        """
+        :param capacity: number of boards and forms kept in memory
+        :param path: the store of the solutions on the disk (dbm), None to keep them in memory only
+        """
+        self.capacity = capacity
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.__memory = OrderedDict()  # board or form -> its solution (values as numbers), least recent first
+        self.__store = dbm.open(path, 'c') if path is not None else None
+
+    def __remember(self, board, solution):
+        self.__memory[board] = solution
+        self.__memory.move_to_end(board)
+        if len(self.__memory) > self.capacity:
+            self.__memory.popitem(last=False)
+
+    def __recall(self, board):
+        solution = self.__memory.get(board)
+        if solution is not None:
+            self.__memory.move_to_end(board)
+        return solution
+
+    def get(self, line_board):
+        """ The solution of a board, if the board or a board of its class was solved
+        :return: the values of the cells of the solved board, None if it is not in the cache
+        """
+        board = line_board.strip()
+        solution = self.__recall(board)
+        if solution is None:
+            try:
+                form, cells, labels, box_size = canonical_form(board)
+            except ValueError:
+                self.misses += 1
+                return None  # not a board, the solver reports it
+            solution = self.__solution_of_form(form, cells, labels, box_size)
+            if solution is not None:
+                self.__remember(board, solution)
+        if solution is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        tokens = CUtil.generate_tokens(int(round(len(solution) ** 0.25)))
+        return [tokens[value - 1] for value in solution]
+
+    def __solution_of_form(self, form, cells, labels, box_size):
+        form_solution = self.__recall(form)
+        if form_solution is None and self.__store is not None:
+            stored = self.__store.get(form)
+            if stored is not None:
+                form_solution = tuple(CUtil.parse_line(stored.decode("ascii"))[0])
+                self.__remember(form, form_solution)
+        if form_solution is None:
+            return None
+        # map the solution of the form back to the board
+        values = {label: value for value, label in labels.items()}
+        solution = [0] * len(form_solution)
+        for cell, label in zip(cells, form_solution):
+            solution[cell] = values[label]
+        return tuple(solution)
+
+    def put(self, line_board, solution):
+        """ Keep the solution of a board, for the board and every board of its class
+        :param solution: the values of the cells of the solved board
+        """
+        board = line_board.strip()
+        solution, _ = CUtil.parse_line(" ".join(solution))
+        form, cells, labels, box_size = canonical_form(board)
+        form_solution = tuple(labels[solution[cell]] for cell in cells)
+        self.__remember(board, tuple(solution))
+        self.__remember(form, form_solution)
+        if self.__store is not None:
+            self.__store[form] = CUtil.format_line(form_solution, box_size)
+
+    def solve_boards(self, boards, solve_many, cached_result, window=4096):
+        """ The results of a solver for the boards, the boards in the cache are not solved again
+        :param solve_many: function of a list of boards that returns the results of the solver for them, in
+                           order - results that start with the solution (None if it failed)
+        :param cached_result: function of a solution and the time of its lookup that returns the result of
+                              a board found in the cache
+        :return: the result of each board, in the order of the boards
+        """
+        for part in batched(boards, window):
+            lookups = []
+            unsolved = dict()  # board -> position in the list to solve, a repeated board is solved once
+            for board in part:
+                start = time.time()
+                solution = self.get(board)
+                lookups.append((solution, time.time() - start))
+                if solution is None:
+                    unsolved.setdefault(board.strip(), len(unsolved))
+
+            results = list(solve_many(list(unsolved))) if unsolved else []
+            for board, (solution, elapsed) in zip(part, lookups):
+                if solution is not None:
+                    yield cached_result(solution, elapsed)
+                    continue
+                result = results[unsolved[board.strip()]]
+                if result[0] is not None:
+                    self.put(board, result[0])
+                yield result
+
+    def close(self):
+        if self.__store is not None:
+            self.__store.close()
+            self.__store = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
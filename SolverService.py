@@ -0,0 +1,363 @@
+"""
+    A long-running solver service over a local socket (Unix or TCP), so a board is solved without starting a
+    process, importing pulp and building the topology of its size for it.
+
+    The service keeps a pool of worker processes that stay up between requests. Every worker builds the topologies
+    of the usual sizes and imports the solvers when it starts, and keeps its own SolutionCache in memory, so a board
+    the worker (or a board of its class) already solved is answered from the cache.
+
+    The protocol is a line for each request, answered by a line, in the order of the requests of the connection.
+    A client may send many requests without waiting for the answers (pipelining):
+
+        plain line:     a board (see CUtil.parse_line), solved by the default solver. The answer is the solved
+                        board as a line, or "FAILED", "TIMED_OUT" or "ERROR <message>"
+        JSON line:      {"id": 7, "board": "...", "solver": "bk_fc_mrv", "time_limit": 1.5, "max_nodes": 100000,
+                         "op": "solve"}
+                        every key but board is optional - solver is a name as in ReportScheduler ("lr", "dlx",
+                        "bk" with the heuristics in the name), op is "solve" or "unique" (see
+                        BacktrackSolver.is_unique). The answer is a JSON line:
+                        {"id": 7, "status": "solved", "solution": "...", "method": "...", "backtracks": 12,
+                         "time": 0.004}
+                        status is "solved", "failed", "timed_out" or "error" (with "error": message), and for op
+                        "unique" the answer has "unique": true, false or null (null if the budget ran out)
+
+    The solves in flight are limited for the whole service (max_concurrent) and the requests read ahead of their
+    answers for every connection (max_pipeline), so a fast client waits for the pool instead of filling the memory.
+
+        python SolverService.py --socket /tmp/sudoku.sock --workers 4
+        python SolverService.py --host 127.0.0.1 --port 7070
+
+        printf '%s\\n' "$(head -1 sudoku_boards_txt/hard_95.txt)" | nc -U /tmp/sudoku.sock
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import BacktrackSolver as BkSolver
+import DancingLinksSolver as DlxSolver
+import LinearProgrammingSolver as LpSolver
+from SolutionCache import SolutionCache
+from backtraking.Budget import Budget
+from backtraking.CUtil import CUtil
+from backtraking.Topology import Topology
+
+DEFAULT_SOLVER = "bk_arc_fc_mrv"
+LINE_LIMIT = 1 << 20  # the longest request line, in bytes
+
+# The answers of a request, a plain line gets the status in upper case when it is not solved
+SOLVED = "solved"
+FAILED = "failed"
+TIMED_OUT = "timed_out"
+ERROR = "error"
+
+_cache = None  # the SolutionCache of a worker process
+
+
+def _init_worker(box_sizes, cache_capacity):
+    """ Warm a worker process: the topologies of the usual sizes and the cache of its solutions
+    """
+    global _cache
+    for box_size in box_sizes:
+        Topology.get(box_size)
+    _cache = SolutionCache(cache_capacity) if cache_capacity else None
+
+
+def solve_request(solver_name, board, time_limit=None, max_nodes=None):
+    """ Solve one board in a worker process
+    :param solver_name: "lr", "dlx" or "bk" with the heuristics in the name, for example "bk_arc_fc_mrv"
+    :return: the status (SOLVED, FAILED or TIMED_OUT), the solved board as a line (None if it is not solved),
+             how it was solved, the number of backtracks and the time it took
+    """
+    if solver_name not in ("lr", "dlx", "bk") and not solver_name.startswith("bk_"):
+        raise ValueError(f"Unknown solver: {solver_name}")
+    start = time.time()
+    board = board.strip()
+    if _cache is not None:
+        solution = _cache.get(board)
+        if solution is not None:
+            return SOLVED, _solution_line(solution), BkSolver.CACHED, 0, time.time() - start
+
+    budget = Budget(time_limit, max_nodes) if time_limit is not None or max_nodes is not None else None
+    timed_out = False
+    backtracks = 0
+    if solver_name == "lr":
+        solution, _, _, timed_out = LpSolver.solve_board(board, budget=budget)
+        method = "linear programming"
+    elif solver_name == "dlx":
+        solution, backtracks = DlxSolver.DancingLinksSolver.solve_board(board)
+        method = "dancing links"
+    else:
+        heuristics = solver_name.split("_")[1:]
+        solution, method, backtracks, _, _ = BkSolver.solve_board(board, arc="arc" in heuristics,
+                                                                  forward_check="fc" in heuristics,
+                                                                  mrv="mrv" in heuristics, degree=False,
+                                                                  propagation=(), bitmask=True, budget=budget)
+        timed_out = backtracks == BkSolver.TIMED_OUT
+
+    elapsed = time.time() - start
+    if solution is None:
+        return TIMED_OUT if timed_out else FAILED, None, method, backtracks, elapsed
+    if _cache is not None:
+        _cache.put(board, solution)
+    return SOLVED, _solution_line(solution), method, backtracks, elapsed
+
+
+def unique_request(board, time_limit=None, max_nodes=None):
+    """ Check in a worker process whether a board has a single solution (see BacktrackSolver.is_unique)
+    """
+    budget = Budget(time_limit, max_nodes) if time_limit is not None or max_nodes is not None else None
+    return BkSolver.is_unique(board, budget)
+
+
+def _solution_line(solution):
+    cells, grid_size = CUtil.parse_line(" ".join(solution))
+    return CUtil.format_line(cells, grid_size)
+
+
+class SolverService:
+    """ An asyncio server of solve requests, the solves run in a pool of worker processes
+    """
+    def __init__(self, socket_path=None, host="127.0.0.1", port=7070, workers=None, max_concurrent=None,
+                 max_pipeline=64, cache_capacity=4096, box_sizes=(3, 4, 5), default_solver=DEFAULT_SOLVER):
+        """
+        :param socket_path: path of a Unix socket, None to listen on host and port (TCP)
+        :param workers: number of worker processes, None for one per core
+        :param max_concurrent: solves in flight for all the connections, None for twice the workers
+        :param max_pipeline: requests of a connection read ahead of their answers
+        :param cache_capacity: boards kept in the cache of every worker, 0 for no cache
+        :param box_sizes: the box sizes whose topologies the workers build when they start
+        """
+        self.socket_path = socket_path
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count()
+        self.max_concurrent = max_concurrent or 2 * self.workers
+        self.max_pipeline = max_pipeline
+        self.cache_capacity = cache_capacity
+        self.box_sizes = tuple(box_sizes)
+        self.default_solver = default_solver
+        self.requests = 0  # requests answered
+        self.__pool = None
+        self.__server = None
+        self.__slots = None  # the semaphore of the solves in flight
+        self.__connections = set()  # the tasks serving the open connections
+        self.__closing = asyncio.Event()  # set when the connections read no more requests
+
+    async def start(self):
+        self.__pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                          initargs=(self.box_sizes, self.cache_capacity))
+        self.__slots = asyncio.Semaphore(self.max_concurrent)
+        if self.socket_path is not None:
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            self.__server = await asyncio.start_unix_server(self.__serve_connection, path=self.socket_path,
+                                                            limit=LINE_LIMIT)
+        else:
+            self.__server = await asyncio.start_server(self.__serve_connection, self.host, self.port,
+                                                       limit=LINE_LIMIT)
+        # start the workers now, so the first requests do not wait for them
+        await asyncio.gather(*(self.__run(os.getpid) for _ in range(self.workers)))
+
+    async def serve_forever(self):
+        async with self.__server:
+            await self.__server.serve_forever()
+
+    async def close(self):
+        if self.__server is not None:
+            self.__server.close()
+            await self.__server.wait_closed()
+            self.__server = None
+        # the open connections stop reading, answer the requests they already read and close
+        self.__closing.set()
+        await asyncio.gather(*self.__connections, return_exceptions=True)
+        if self.__pool is not None:
+            self.__pool.shutdown(wait=True, cancel_futures=True)
+            self.__pool = None
+        if self.socket_path is not None and os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    @property
+    def address(self):
+        """ The path of the Unix socket, or the (host, port) the service listens on """
+        if self.socket_path is not None:
+            return self.socket_path
+        return self.__server.sockets[0].getsockname()[:2]
+
+    async def __run(self, function, *args):
+        async with self.__slots:
+            return await asyncio.get_running_loop().run_in_executor(self.__pool, function, *args)
+
+    async def __serve_connection(self, reader, writer):
+        task = asyncio.current_task()
+        self.__connections.add(task)
+        try:
+            # the answers of the connection in the order of its requests, each one a task solving its request
+            answers = asyncio.Queue(self.max_pipeline)
+            sender = asyncio.create_task(self.__send_answers(answers, writer))
+            try:
+                while not sender.done():
+                    line = await self.__read_line(reader)
+                    if not line:
+                        break
+                    line = line.decode().strip()
+                    if line:
+                        await answers.put(asyncio.create_task(self.answer(line)))
+            except (ConnectionError, ValueError):
+                pass  # the client went away, or sent a line that is not text or is too long
+            finally:
+                await answers.put(None)
+                await sender
+        finally:
+            self.__connections.discard(task)
+
+    # The next line of a connection, b"" at its end or once the service is closing
+    async def __read_line(self, reader):
+        if self.__closing.is_set():
+            return b""
+        read = asyncio.ensure_future(reader.readline())
+        closing = asyncio.ensure_future(self.__closing.wait())
+        done, _ = await asyncio.wait((read, closing), return_when=asyncio.FIRST_COMPLETED)
+        closing.cancel()
+        if read not in done:
+            read.cancel()
+            return b""
+        return read.result()
+
+    async def __send_answers(self, answers, writer):
+        try:
+            while True:
+                answer = await answers.get()
+                if answer is None:
+                    break
+                writer.write((await answer + "\n").encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            # the client went away: the requests read ahead are not solved
+            while not answers.empty():
+                answer = answers.get_nowait()
+                if answer is not None:
+                    answer.cancel()
+            writer.close()
+
+    async def answer(self, line):
+        """ The answer line of a request line (see the protocol above)
+        """
+        self.requests += 1
+        if not line.startswith("{"):
+            try:
+                status, solution, _, _, _ = await self.__run(solve_request, self.default_solver, line)
+            except Exception as error:
+                # a bad board, or a solver that failed - the answer of the request, never of the connection
+                return f"ERROR {_error_message(error)}"
+            return solution if status == SOLVED else status.upper()
+
+        try:
+            request = parse_request(line, self.default_solver)
+        except ValueError as error:
+            return json.dumps({"id": _request_id(line), "status": ERROR, "error": str(error)})
+
+        result = {"id": request["id"]}
+        try:
+            if request["op"] == "unique":
+                unique = await self.__run(unique_request, request["board"], request["time_limit"],
+                                          request["max_nodes"])
+                result.update(status=TIMED_OUT if unique is None else SOLVED, unique=unique)
+            else:
+                status, solution, method, backtracks, elapsed = await self.__run(
+                    solve_request, request["solver"], request["board"], request["time_limit"], request["max_nodes"])
+                result.update(status=status, solution=solution, method=method, backtracks=backtracks, time=elapsed)
+        except Exception as error:
+            result.update(status=ERROR, error=_error_message(error))
+        return json.dumps(result)
+
+
+def parse_request(line, default_solver=DEFAULT_SOLVER):
+    """ The fields of a JSON request line, checked before the request is handed to a worker
+    :return: dict of id, board, solver, op, time_limit and max_nodes - the defaults for the keys not given
+    :raise ValueError: the line is not a request, or a field has a wrong type or value
+    """
+    request = json.loads(line)
+    if not isinstance(request, dict) or not isinstance(request.get("board"), str):
+        raise ValueError("a request needs a board")
+
+    def field(name, types, default=None):
+        value = request.get(name, default)
+        # bool is an int, but true is not a number of nodes
+        if value is not None and (not isinstance(value, types) or isinstance(value, bool)):
+            raise ValueError(f"{name} has a wrong type: {json.dumps(value)}")
+        return value
+
+    fields = {"id": field("id", (str, int, float)), "board": request["board"],
+              "solver": field("solver", str, default_solver), "op": field("op", str, "solve"),
+              "time_limit": field("time_limit", (int, float)), "max_nodes": field("max_nodes", int)}
+    if fields["op"] not in ("solve", "unique"):
+        raise ValueError(f"Unknown op: {fields['op']}")
+    if fields["time_limit"] is not None and fields["time_limit"] < 0:
+        raise ValueError("time_limit must not be negative")
+    if fields["max_nodes"] is not None and fields["max_nodes"] < 0:
+        raise ValueError("max_nodes must not be negative")
+    return fields
+
+
+def _request_id(line):
+    """ The id of a request line that is not a valid request, if it has one """
+    try:
+        request = json.loads(line)
+    except ValueError:
+        return None
+    request_id = request.get("id") if isinstance(request, dict) else None
+    if isinstance(request_id, (str, int, float)) and not isinstance(request_id, bool):
+        return request_id
+    return None
+
+
+def _error_message(error):
+    if isinstance(error, ValueError):
+        return str(error)
+    return f"{type(error).__name__}: {error}"
+
+
+async def serve(service):
+    await service.start()
+    loop = asyncio.get_running_loop()
+    stopped = asyncio.Event()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signal_number, stopped.set)
+    print(f"Serving on {service.address} with {service.workers} workers", file=sys.stderr)
+    server = asyncio.create_task(service.serve_forever())
+    await stopped.wait()
+    server.cancel()
+    await service.close()
+    print(f"Stopped after {service.requests} requests", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve solve requests over a local socket")
+    parser.add_argument("--socket", help="path of a Unix socket, instead of --host and --port")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7070)
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes, one per core if"
+                                                                  " not given")
+    parser.add_argument("--max-concurrent", type=int, default=None,
+                        help="solves in flight for all the connections, twice the workers if not given")
+    parser.add_argument("--max-pipeline", type=int, default=64, help="requests of a connection read ahead")
+    parser.add_argument("--cache-capacity", type=int, default=4096, help="boards cached by every worker, 0 for"
+                                                                         " no cache")
+    parser.add_argument("--solver", default=DEFAULT_SOLVER, help="the solver of the plain line requests")
+    args = parser.parse_args(argv)
+
+    service = SolverService(args.socket, args.host, args.port, args.workers, args.max_concurrent,
+                            args.max_pipeline, args.cache_capacity, default_solver=args.solver)
+    asyncio.run(serve(service))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""
+    The solvers from the command line, for scripts and pipelines: the boards are read from files or the standard
+    input as a stream, and a JSON line is written to the standard output for every board as soon as it is solved:
+
+        {"file": "hard_95.txt", "board": 1, "status": "solved", "solution": "4173698...", "method": "back tracing",
+         "time": 0.021, "backtracks": 12, "stats": {"nodes": 30, "backtracks": 12, "propagations": 0, ...}}
+
+    status is "solved", "failed", "timed_out" or "error" (with "error": the message, for a line that is not a
+    board). board is the number of the board in its file, as ReportScheduler numbers them. stats are the counters
+    and the phase timings of the board (see SolveStats), null for Dancing Links.
+
+    The backtracking solver runs with forward checking, MRV and all the rules of Propagation by default, and every
+    board has TIME_LIMIT seconds, so a hard board in a stream gives up instead of holding the rest of the stream -
+    --no-fc, --no-mrv, --no-propagation and --time-limit 0 turn them off.
+
+    The boards are read as they are solved and handed to the processes a window at a time (see map_boards), so the
+    memory does not grow with the input. A packed corpus (see pack_corpus) is read from its map by the processes.
+
+        python StreamSolver.py sudoku_boards_txt/hard_95.txt --arc > hard_95.jsonl
+        cat boards.txt | python StreamSolver.py --engine lr --time-limit 2 --workers 0
+        python StreamSolver.py boards.txt --no-fc --no-mrv --no-propagation --time-limit 0
+        python main.py sudoku_boards_txt/easy_1000.txt --engine dlx
+"""
+import argparse
+import json
+import sys
+import time
+from contextlib import nullcontext
+from functools import partial
+
+import BacktrackSolver as BkSolver
+import DancingLinksSolver as DlxSolver
+import LinearProgrammingSolver as LpSolver
+from BoardSource import PackedBoardFile, map_boards, read_boards
+from backtraking.Budget import Budget
+from backtraking.CUtil import CUtil
+from backtraking.Propagation import Propagation
+
+ENGINES = ("bk", "lr", "dlx")
+
+SOLVED = "solved"
+FAILED = "failed"
+TIMED_OUT = "timed_out"
+ERROR = "error"
+
+# The seconds of a board by default
+TIME_LIMIT = 10.0
+
+
+def solve_line(line_board, engine="bk", arc=False, forward_check=True, mrv=True, degree=False,
+               propagation=Propagation.RULES, reduced=False, budget=None):
+    """ Solve one board, on its own so the boards can be spread over processes
+    :param line_board: Sudoku board - a line of n^2 chars or tokens (see CUtil.parse_line)
+    :param engine: "bk", "lr" or "dlx", the heuristics are of the backtracking solver and reduced of the linear
+                   programming solver
+    :param budget: the limits of the board (see Budget), None for no limit - Dancing Links has no limits
+    :return: dict of the result of the board, without its file and number
+    """
+    start = time.time()
+    stats = None
+    timed_out = False
+    try:
+        if engine == "lr":
+            solution, _, stats, timed_out = LpSolver.solve_board(line_board, reduced, collect_stats=True,
+                                                                 budget=budget)
+            method, backtracks = "linear programming", 0
+        elif engine == "dlx":
+            solution, backtracks = DlxSolver.DancingLinksSolver.solve_board(line_board)
+            method = "dancing links"
+        else:
+            solution, method, backtracks, _, stats = BkSolver.solve_board(line_board, arc, forward_check, mrv,
+                                                                          degree, propagation, bitmask=True,
+                                                                          collect_stats=True, budget=budget)
+            timed_out = backtracks == BkSolver.TIMED_OUT
+            backtracks = stats.backtracks
+    except ValueError as error:
+        return {"status": ERROR, "error": str(error), "time": time.time() - start}
+
+    if solution is None:
+        status = TIMED_OUT if timed_out else FAILED
+    else:
+        status = SOLVED
+        cells, grid_size = CUtil.parse_line(" ".join(solution))
+        solution = CUtil.format_line(cells, grid_size)
+    return {"status": status, "solution": solution, "method": method, "time": time.time() - start,
+            "backtracks": backtracks, "stats": stats.as_dict() if stats is not None else None}
+
+
+def solve_stream(boards, name, out, solve_one, workers=1, window=4096):
+    """ Solve the boards of a source and write a JSON line for each one as it is solved
+    :param boards: any iterable of board lines, or a PackedBoardFile
+    :param name: the name of the source in the results, "-" for the standard input
+    :return: the number of boards and the number of solved boards
+    """
+    count, solved = 0, 0
+    for number, result in enumerate(map_boards(solve_one, boards, workers, window), start=1):
+        count += 1
+        solved += result["status"] == SOLVED
+        out.write(json.dumps({"file": name, "board": number, **result}) + "\n")
+        out.flush()
+    return count, solved
+
+
+def read_stdin():
+    """ The boards of the standard input, read one at a time """
+    for line in sys.stdin:
+        board = line.strip()
+        if board:
+            yield board
+
+
+def open_source(path):
+    """ The boards of a source as a context manager - a PackedBoardFile for a packed corpus, otherwise a stream
+    of the lines of the file (of the standard input for "-")
+    """
+    if path == "-":
+        return nullcontext(read_stdin())
+    with open(path, 'rb') as fp:
+        packed = fp.read(len(PackedBoardFile.MAGIC)) == PackedBoardFile.MAGIC
+    return PackedBoardFile(path) if packed else nullcontext(read_boards(path))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve a stream of boards, a JSON line for every board")
+    parser.add_argument("files", nargs="*", default=["-"],
+                        help="files of boards, one board in a line, or packed corpora - '-' for the standard input")
+    parser.add_argument("--engine", choices=ENGINES, default="bk",
+                        help="backtracking, linear programming or dancing links")
+    parser.add_argument("--arc", action="store_true", help="backtracking: AC-3 before the search")
+    parser.add_argument("--fc", action=argparse.BooleanOptionalAction, default=True,
+                        help="backtracking: forward checking")
+    parser.add_argument("--mrv", action=argparse.BooleanOptionalAction, default=True,
+                        help="backtracking: minimum remaining values")
+    parser.add_argument("--degree", action="store_true", help="backtracking: break the ties of MRV by degree")
+    parser.add_argument("--propagation", nargs="*", choices=Propagation.RULES, default=[],
+                        help="backtracking: rules of Propagation before and during the search, all of them if"
+                             " none is given")
+    parser.add_argument("--no-propagation", action="store_true",
+                        help="backtracking: no Propagation (the default is all of its rules)")
+    parser.add_argument("--reduced", action="store_true",
+                        help="linear programming: model only the candidates left after propagation")
+    parser.add_argument("--time-limit", type=float, default=TIME_LIMIT, help="seconds for each board, 0 for no limit")
+    parser.add_argument("--max-nodes", type=int, default=None,
+                        help="nodes of the search of each board, 0 for no limit")
+    parser.add_argument("--workers", type=int, default=1, help="number of processes, 0 for one per core")
+    parser.add_argument("--window", type=int, default=4096, help="boards handed to the processes at a time")
+    args = parser.parse_args(argv)
+
+    propagation = tuple(args.propagation)
+    if not propagation and not args.no_propagation:
+        propagation = Propagation.RULES
+    budget = None
+    if args.time_limit or args.max_nodes:
+        budget = Budget(args.time_limit or None, args.max_nodes or None)
+    solve_one = partial(solve_line, engine=args.engine, arc=args.arc, forward_check=args.fc, mrv=args.mrv,
+                        degree=args.degree, propagation=propagation, reduced=args.reduced, budget=budget)
+
+    count, solved = 0, 0
+    for path in args.files:
+        with open_source(path) as boards:
+            file_count, file_solved = solve_stream(boards, path, sys.stdout, solve_one, args.workers or None,
+                                                   args.window)
+        count += file_count
+        solved += file_solved
+    print(f"Solved {solved} of {count} boards", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,79 +1,90 @@
-import queue
+from collections import deque
 
 
 # https://www.youtube.com/watch?v=mo0gmLMC72E
 class ArcConsistency():
 
     """
-        queue with all the arcs of CSP
+        worklist with the arcs of CSP, as arc numbers of the Topology
+        in_queue has one byte per arc, set while the arc is waiting in the worklist, so an arc is never
+        queued twice
+        nodes_expanded counts the arcs revised, removals the revisions that removed a value
     """
-    q = queue.Queue()
-    nodes_expanded = 0
-
     def __init__(self, constraint):
-        for arc in constraint.constraints_tuples:
-            self.q.put(arc)
+        self.q = deque(range(len(constraint.constraints_tuples)))
+        self.in_queue = bytearray(b'\x01') * len(constraint.constraints_tuples)
+        self.nodes_expanded = 0
+        self.removals = 0
 
     def ac3(self, constraint):
-        i = 0
         """
-            (X,Y) is an arc 
-            
+            (X,Y) is an arc
+
             Represented as X-> Y
-            
+
             X, Y is consistent if, for each value 'x' that X can take, there is a value 'y' that
-            Y can take respecting the restriction 
-            
+            Y can take respecting the restriction
+
             Similarly, vice-versa for Y->X
         """
-        while not self.q.empty():
-            (X, Y) = self.q.get()
-            i += 1
+        arcs = constraint.constraints_tuples
+        incoming_arcs = constraint.topology.incoming_arcs
+        q = self.q
+        in_queue = self.in_queue
+
+        while q:
+            arc = q.popleft()
+            in_queue[arc] = 0
+            (X, Y) = arcs[arc]
+            self.nodes_expanded += 1
 
             # Remove consistent values
             if self.arc_reduce(constraint, X, Y):
-                if len(constraint.board[X]) == 0:
+                self.removals += 1
+                domain = constraint.board[X]
+                if not domain:
                     return False
 
-                for Z in (constraint.neighbour[X] - set(Y)):
-                    self.q.put((Z, X))
+                # an arc (Z, X) can only remove a value from Z when X has a single value left
+                if self.is_single(constraint, domain):
+                    for incoming in incoming_arcs[X]:
+                        if not in_queue[incoming] and arcs[incoming][0] != Y:
+                            in_queue[incoming] = 1
+                            q.append(incoming)
 
         return True
 
     # returns true if a value is removed
-    def arc_reduce(self, constraint, X, Y):
-        reduced = False
-        values = set(constraint.board[X])
-
+    @staticmethod
+    def arc_reduce(constraint, X, Y):
         """
-            values ->
-                Domain for X
-                Possible set of values that can be assigned
+            The restriction between X and Y is X != Y, so a value 'x' of X has a value 'y' of Y respecting
+            the restriction unless the domain of Y is exactly 'x'.
+            That means the arc removes a value only when Y has a single value left, and that value is
+            removed from X (in this case constraint.board[X]) - no loop over the values of X or Y.
         """
-        for x in values:
-            if not self.is_consistent(constraint, x, X, Y):
-                """
-                    if there is no value that satisfies the restriction between X->Y
-                    remove x from set of possible values (in this case constraint.board[X])
-                """
-                constraint.board[X] = constraint.board[X].replace(x, '')
-                reduced = True
-
-        return reduced
-
-    """
-        check if the value x is consistent (respecting the constraints) with all possible values of Y
-    """
-    @staticmethod
-    def is_consistent(constraint, x, X, Y):
-        for y in constraint.board[Y]:
-            if Y in constraint.neighbour[X] and y != x:
+        domain_y = constraint.board[Y]
+        if constraint.bitmask:
+            if domain_y & (domain_y - 1) == 0 and constraint.board[X] & domain_y:
+                constraint.board[X] ^= domain_y
                 return True
+        elif len(domain_y) == 1 and domain_y in constraint.board[X]:
+            constraint.board[X] = constraint.board[X].replace(domain_y, '')
+            return True
         return False
 
+    @staticmethod
+    def is_single(constraint, domain):
+        if constraint.bitmask:
+            return domain & (domain - 1) == 0
+        return len(domain) == 1
+
     @staticmethod
     def is_complete(constraint):
-        for variable, value in constraint.board.items():
-            if len(constraint.board[variable]) > 1:
+        for value in constraint.board:
+            if constraint.bitmask:
+                if value == 0 or value & (value - 1):
+                    return False
+            elif len(value) > 1:
                 return False
         return True
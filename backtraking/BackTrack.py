@@ -1,11 +1,23 @@
-from copy import deepcopy
 import random
+import time
+from backtraking.BitDomain import BitDomain, popcount
+from backtraking.MinimumRemainingValues import MinimumRemainingValues
 
 
 class BackTracking:
-    def __init__(self, forward_check=True):
+    def __init__(self, forward_check=True, max_nodes=None, deadline=None):
+        """
+        :param max_nodes: the search gives up after this number of nodes, None for no limit
+        :param deadline: the search gives up at this time (time.time()), None for no limit
+        """
         self.forward_check = forward_check
-        self.time = 0
+        self.time = 0  # values taken back
+        self.nodes = 0  # nodes of the search
+        self.max_nodes = max_nodes
+        self.deadline = deadline
+        self.timed_out = False  # the search gave up on the budget, not because there is no solution
+        self.limit = 1  # the search stops at this number of solutions (see count_solutions)
+        self.solutions = 0  # complete states found
     """
         In Backtracking, we start with a empty state. (No values to the variables).
         We then pick one variable from the set.
@@ -23,33 +35,95 @@ class BackTracking:
             constraints established.
     """
 
-    def backtracking_search(self, constraint, mrv=True):
-        return self.backtrack({}, constraint, mrv)
+    def backtracking_search(self, constraint, mrv=True, degree=False):
+        """
+        :param degree: with mrv, break ties between cells with the same number of remaining values by
+                       the number of unassigned peers
+        """
+        state = {}
+        if mrv:
+            constraint.remaining_values = MinimumRemainingValues(constraint, state, degree)
+        return self.backtrack(state, constraint, mrv)
+
+    def count_solutions(self, constraint, limit=2, mrv=True, degree=False):
+        """ Count the solutions of the board: the search goes on after a complete state as if it failed, until
+        it found limit of them. The domains narrowed at a node (by forward checking or the propagation stage)
+        are kept on the trail for all the branches below it, so the siblings do not narrow them again.
+        :return: the number of solutions, limit if there are at least limit (the solutions found so far if the
+                 search gave up on its budget)
+        """
+        self.limit = limit
+        self.backtracking_search(constraint, mrv, degree)
+        return self.solutions
 
     def backtrack(self, state, constraint, mrv):
         """
         if state is complete, then return state (If all the variable has a particular value)
+
+        The search keeps a stack of the assigned cells instead of calling itself for every node, so its depth is
+        not bounded by the recursion limit of Python and a node costs no call. It visits the nodes in the order
+        of a recursive search.
         :param mrv: flag
         :param state:
         :param constraint:
-        :return:
+        :return: the complete state, -1 if there is none or the search gave up on its budget
         """
-        if self.is_complete(state, constraint):
-            return state
+        trail = constraint.trail
+        # a frame for every assigned cell: the cell, the length of the trail before it and its values not tried yet
+        stack = []
 
-        """
-            select unassigned variable and assign values to it
-            Heuristics -> MRV (Minimum remaining value)
-        """
-        if mrv:
-            cell = self.get_minimum_remaining_value(state, constraint)
-        else:
-            cell = self.next_cell(state, constraint)
+        while True:
+            # a new node, the state has one more assignment than its parent
+            self.nodes += 1
+            if self.max_nodes is not None and self.nodes > self.max_nodes:
+                return self.give_up(stack)
+            # the clock is read once every 256 nodes
+            if self.deadline is not None and not self.nodes & 255 and time.time() > self.deadline:
+                return self.give_up(stack)
+            if self.is_complete(state, constraint):
+                self.solutions += 1
+                if self.solutions >= self.limit or not stack:
+                    return state
+                # counting solutions, the search goes on with the next value of the last cell
+                self.take_back(stack[-1], state, constraint)
+            else:
+                """
+                    select unassigned variable and assign values to it
+                    Heuristics -> MRV (Minimum remaining value)
+                """
+                if mrv:
+                    cell = self.get_minimum_remaining_value(state, constraint)
+                else:
+                    cell = self.next_cell(state, constraint)
+                # every change of the board made after this point is on the trail
+                stack.append((cell, len(trail), iter(self.domain_values(constraint, cell))))
+
+            # try the values of the cell on top of the stack, back to the cell below when it has no value left
+            while True:
+                cell, mark, values = stack[-1]
+                if self.assign_next(cell, mark, values, state, constraint):
+                    break
+                stack.pop()
+                if not stack:
+                    return -1
+                self.take_back(stack[-1], state, constraint)
 
-        # deep copy
-        domain = deepcopy(constraint.board)
+    # Take back the value of the cell of a frame of the stack, and the changes of the board made after it
+    def take_back(self, frame, state, constraint):
+        cell, mark, _ = frame
+        self.time += 1
+        del state[cell]
+        if constraint.remaining_values is not None:
+            constraint.remaining_values.unassign(cell)
+        constraint.undo(mark)
 
-        for value in constraint.board[cell]:
+    def assign_next(self, cell, mark, values, state, constraint):
+        """ Assign the cell the next of its values that is consistent (and keeps the peers consistent with
+        forward checking), taking back the values that are not
+        :return: True if a value was assigned, False if the cell has no value left
+        """
+        remaining_values = constraint.remaining_values
+        for value in values:
 
             """
                 check if the value is consistent, given the restrictions
@@ -60,51 +134,55 @@ class BackTracking:
                     add cell = val to state
                 """
                 state[cell] = value
+                if remaining_values is not None:
+                    remaining_values.assign(cell)
 
-                if self.forward_check:
+                if not self.forward_check:
+                    return True
+                if constraint.propagation is not None:
+                    # the propagation stage removes the value from the peers and applies its other rules
+                    deductions = {cell: value} if constraint.propagation.assign(cell, value) else -1
+                else:
                     deductions = {}
                     deductions = self.infer(state, deductions, constraint, cell, value)
-                    if deductions != -1:
-                        result = self.backtrack(state, constraint, mrv)
-                        if result != -1:
-                            return result
-                    self.time += 1
-                    if self.time > 100000000:
-                        del state[cell]
-                        return -1
-                    del state[cell]
-                    constraint.board.update(domain)
-
-                else:
-                    result = self.backtrack(state, constraint, mrv)
-                    if result != -1:
-                        return result
-                    self.time += 1
-                    if self.time > 100000000:
-                        del state[cell]
-                        return -1
-                    del state[cell]
-                    constraint.board.update(domain)
+                if deductions != -1:
+                    return True
+                self.time += 1
+                del state[cell]
+                if remaining_values is not None:
+                    remaining_values.unassign(cell)
+                constraint.undo(mark)
+        return False
 
+    # Stop the search on its budget, every assigned cell counts its value as taken back
+    def give_up(self, stack):
+        self.timed_out = True
+        self.time += len(stack)
         return -1
 
+    # Iterate over the values of the cell domain - characters of a string or single bits of a mask
+    @staticmethod
+    def domain_values(constraint, cell):
+        if constraint.bitmask:
+            return BitDomain.bits(constraint.board[cell])
+        return constraint.board[cell]
+
     @staticmethod
     def is_complete(assignment, constraint):
-        return set(assignment.keys()) == set(constraint.board.keys())
+        return len(assignment) == len(constraint.board)
 
     @staticmethod
     def next_cell(state, constraint):
-        unassigned_cell = {}
-        for cell in constraint.board:
-            if cell not in state.keys():
+        for cell in range(len(constraint.board)):
+            if cell not in state:
                 return cell
 
     @staticmethod
     def select_random_variables(state, constraint):
         unassigned_cell = {}
-        for cell in constraint.board:
+        for cell in range(len(constraint.board)):
             if cell not in state.keys():
-                unassigned_cell.update({cell: len(constraint.board[cell])})
+                unassigned_cell.update({cell: BackTracking.domain_size(constraint, cell)})
         return list(unassigned_cell.keys())[random.randint(0, len(unassigned_cell) - 1)]
 
     @staticmethod
@@ -127,31 +205,91 @@ class BackTracking:
     """
     @staticmethod
     def get_left_over_values_in_domain(constraint, neighbor, value):
-        constraint.board[neighbor] = constraint.board[neighbor].replace(value, "")
+        constraint.trail.append((neighbor, constraint.board[neighbor]))
+        if constraint.bitmask:
+            constraint.board[neighbor] &= ~value
+        else:
+            constraint.board[neighbor] = constraint.board[neighbor].replace(value, "")
+        if constraint.remaining_values is not None:
+            constraint.remaining_values.update(neighbor, constraint.board[neighbor])
         return constraint.board[neighbor]
 
     @staticmethod
     def infer(state, deductions, constraint, cell, value):
+        if constraint.bitmask:
+            return BackTracking.infer_bitmask(state, deductions, constraint, cell, value)
         deductions[cell] = value
+        board = constraint.board
+        neighbour = constraint.neighbour
 
-        for neighbor in constraint.neighbour[cell]:
-            if neighbor not in state and value in constraint.board[neighbor]:
-                if len(constraint.board[neighbor]) == 1:
-                    return -1
-                left_over_values = BackTracking.get_left_over_values_in_domain(constraint, neighbor, value)
+        # the deduced cells whose peers are still to check, the last deduced first - as calls of infer would
+        stack = [(value, iter(neighbour[cell]))]
+        while stack:
+            value, neighbors = stack[-1]
+            for neighbor in neighbors:
+                if neighbor not in state and value in board[neighbor]:
+                    if len(board[neighbor]) == 1:
+                        return -1
+                    left_over_values = BackTracking.get_left_over_values_in_domain(constraint, neighbor, value)
+
+                    if len(left_over_values) == 1:
+                        deductions[neighbor] = left_over_values
+                        stack.append((left_over_values, iter(neighbour[neighbor])))
+                        break
+            else:
+                stack.pop()
+        return deductions
+
+    """
+        Same as infer, on a board of masks: the value is a single bit, the membership check is an AND,
+        a neighbour whose domain equals the value would be left empty, and a left over domain without
+        a second bit is a singleton whose bit is the deduced value.
+    """
+    @staticmethod
+    def infer_bitmask(state, deductions, constraint, cell, value):
+        deductions[cell] = value
+        board = constraint.board
+        trail = constraint.trail
+        neighbour = constraint.neighbour
+        remaining_values = constraint.remaining_values
 
-                if len(left_over_values) == 1:
-                    check = BackTracking.infer(state, deductions, constraint, neighbor, left_over_values)
-                    if check == -1:
+        stack = [(value, iter(neighbour[cell]))]
+        while stack:
+            value, neighbors = stack[-1]
+            for neighbor in neighbors:
+                domain = board[neighbor]
+                if domain & value and neighbor not in state:
+                    if domain == value:
                         return -1
+                    left_over_values = domain ^ value
+                    trail.append((neighbor, domain))
+                    board[neighbor] = left_over_values
+                    if remaining_values is not None:
+                        remaining_values.update(neighbor, left_over_values)
+
+                    if not left_over_values & (left_over_values - 1):
+                        deductions[neighbor] = left_over_values
+                        stack.append((left_over_values, iter(neighbour[neighbor])))
+                        break
+            else:
+                stack.pop()
         return deductions
 
+    @staticmethod
+    def domain_size(constraint, cell):
+        if constraint.bitmask:
+            return popcount(constraint.board[cell])
+        return len(constraint.board[cell])
+
     @staticmethod
     def get_minimum_remaining_value(state, constraint):
+        if constraint.remaining_values is not None:
+            return constraint.remaining_values.select()
         unassigned_cell = {}
-        for cell in constraint.board:
-            if cell not in state.keys():
-                unassigned_cell.update({cell: len(constraint.board[cell])})
+        size = popcount if constraint.bitmask else len
+        for cell, domain in enumerate(constraint.board):
+            if cell not in state:
+                unassigned_cell[cell] = size(domain)
         minimum_remaining_value = min(unassigned_cell, key=unassigned_cell.get)
         return minimum_remaining_value
 
@@ -0,0 +1,61 @@
+"""
+    Integer bitmask representation of a cell domain.
+
+    Every value a cell can take gets one bit, in the same order as the candidate string
+    produced by CUtil ('1'..'9' then 'A', 'B', ...):
+
+                '1' -> 0b0001    '2' -> 0b0010    '3' -> 0b0100 ...
+
+    A domain is the OR of the bits of its candidates, so '135' is 0b10101.
+    Removing a value is a single AND NOT, membership is a single AND, and a domain is a
+    singleton when clearing its lowest bit leaves zero - no string is allocated on any of them.
+"""
+
+try:
+    popcount = int.bit_count
+except AttributeError:  # python < 3.10
+    def popcount(mask):
+        return bin(mask).count("1")
+
+
+class BitDomain:
+
+    # Returns a mask with one bit for each of the values of the board
+    @staticmethod
+    def full(number_of_values):
+        return (1 << number_of_values) - 1
+
+    # Returns the mask of the candidates given as a string of characters
+    # Ex: '135' -> 0b10101
+    @staticmethod
+    def from_string(candidates, values):
+        mask = 0
+        for char in candidates:
+            mask |= 1 << values.index(char)
+        return mask
+
+    # Returns the candidates of the mask as a string of characters
+    # Ex: 0b10101 -> '135'
+    @staticmethod
+    def to_string(mask, values):
+        candidates = ''
+        for index, char in enumerate(values):
+            if mask & (1 << index):
+                candidates += char
+        return candidates
+
+    @staticmethod
+    def size(mask):
+        return popcount(mask)
+
+    @staticmethod
+    def is_single(mask):
+        return mask != 0 and not mask & (mask - 1)
+
+    # Iterate over the values of the mask (each one as a single bit), lowest value first
+    @staticmethod
+    def bits(mask):
+        while mask:
+            bit = mask & -mask
+            yield bit
+            mask ^= bit
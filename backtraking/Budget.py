@@ -0,0 +1,37 @@
+"""
+    The limits of the solve of one board. A board that reaches one of them is given up and reported as timed out,
+    and the solve goes on to the next board.
+
+        time_limit: seconds for each board
+        max_nodes:  nodes of the search of each board - calls of the backtracking search, branch and bound nodes
+                    of the linear programming solver
+        deadline:   the time (time.time()) at which every board that is not finished yet times out, the deadline
+                    of a whole batch of boards
+
+    The search checks the budget itself as it goes (BackTracking), the linear programming solver hands the time
+    left and the nodes to CBC.
+"""
+import time
+
+
+class Budget:
+    def __init__(self, time_limit=None, max_nodes=None, deadline=None):
+        """ None for no limit """
+        self.time_limit = time_limit
+        self.max_nodes = max_nodes
+        self.deadline = deadline
+
+    # The time at which a board starting now times out, None if it has no time limit
+    def board_deadline(self):
+        deadline = self.deadline
+        if self.time_limit is not None:
+            board_deadline = time.time() + self.time_limit
+            deadline = board_deadline if deadline is None else min(deadline, board_deadline)
+        return deadline
+
+    # The seconds left until the deadline, None for no deadline
+    @staticmethod
+    def seconds_left(deadline):
+        if deadline is None:
+            return None
+        return max(0.0, deadline - time.time())
@@ -1,150 +1,81 @@
 import string
+from backtraking.BitDomain import BitDomain
 
-class CUtil:
-
-    # Returns a dictionary containing the cell UID as they key and the data for the cell as the value
-    # Ex: 'AA': 2, 'AB': 4 ....
-    @staticmethod
-    def generate_board(initial_board, grid_size):
-        board_dictionary = dict()
-        iterator = 0
-        board_identifiers = CUtil.__generate_board_identifiers(grid_size)
-
-        # The default values
-        value_in_board = [str(i) for i in range(1, 10)]
-        # Add additional values ​​according to the size of the table
-        value_in_board.extend(list(string.ascii_uppercase[0:int(grid_size ** 2) - 9]))
-        candid = ''
-        for char in value_in_board:
-            candid += char
-
-        for row in initial_board:
-            for data in row:
-                identifier = board_identifiers[iterator]
-                board_dictionary[identifier] = data
-                if data == '0':
-                    board_dictionary[identifier] = candid
-                iterator += 1
-
-        return board_dictionary
-
-    # returns a dictionary containing possible constraints for each cell
-    # Ex: 'AA': 'AB', 'AC' ....
-    @staticmethod
-    def generate_constraint_dictionary(grid_size):
-        identifiers = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
-        board_size = grid_size * grid_size
-        rows_selected = columns_selected = identifiers[:board_size]
-
-        board_identifiers = CUtil.__generate_board_identifiers(grid_size)
-        generated_grids = CUtil.__generate_grids(rows_selected, grid_size)
-
-        constraints = dict()
-
-        for board_identifier in board_identifiers:
-            rows = CUtil.__others_in_row(board_identifier, rows_selected)
-            columns = CUtil.__others_in_columns(board_identifier, columns_selected)
-            grids = CUtil.__others_in_grid(board_identifier, generated_grids)
-
-            constraints[board_identifier] = set(rows + columns + grids)
-
-        return constraints
-
-    # returns a tuple containing possible constraints for each cell
-    # Ex: ('AA', 'AB'), ('AA', AC') ....
-    @staticmethod
-    def constraints_as_tuple(constraints):
-        constraints_tuples = []
-        for key, values in constraints.items():
-            for value in values:
-                constraints_tuples.append((key, value))
-
-        return constraints_tuples
-
-    @staticmethod
-    def __others_in_row(board_identifier, identifiers):
-        # if 'AB' then get just 'A', because that's the row
-        row_identifier = board_identifier[0]
-        others = []
+# The chars of the values of a board line, a board of up to 35 values has a char for each value
+VALUE_CHARS = string.digits[1:] + string.ascii_uppercase
 
-        for identifier in identifiers:
-            new_element = row_identifier + identifier
-            if new_element != board_identifier:
-                others.append(new_element)
 
-        return others
+class CUtil:
+    __codes = dict()  # grid size -> token -> value number, for parse_line
 
+    # Returns a list containing the data for each cell, indexed by the cell number (see Topology)
+    # Ex: ['2', '4', '123456789', ....]
+    # With bitmask=True the data of each cell is an integer mask of its candidates (see BitDomain)
+    # Ex: [0b10, 0b1000, 0b111111111, ....]
+    # cells are the values of the cells as numbers (see parse_line), 0 for an empty cell
     @staticmethod
-    def __others_in_columns(board_identifier, identifiers):
-        # if 'AB' then get just 'B', because that's the columns
-        column_identifier = board_identifier[1]
-        others = []
-
-        for identifier in identifiers:
-            new_element = identifier + column_identifier
-            if new_element != board_identifier:
-                others.append(new_element)
-
-        return others
-
+    def generate_board(cells, grid_size, bitmask=False):
+        number_of_values = grid_size * grid_size
+        if bitmask:
+            full_domain = BitDomain.full(number_of_values)
+            return [full_domain if value == 0 else 1 << (value - 1) for value in cells]
+
+        # a domain of candidates is a string, one char for each value
+        if number_of_values > len(VALUE_CHARS):
+            raise ValueError(f"A board of {number_of_values} values needs domains as masks (bitmask=True)")
+        candid = CUtil.generate_values(grid_size)
+        return [candid if value == 0 else candid[value - 1] for value in cells]
+
+    # Returns a string with all the values that a cell can take, in the order of the bits of BitDomain
+    # Ex: '1234' for 4x4, '123456789' for 9x9, '123456789ABCDEFG' for 16x16
     @staticmethod
-    def __others_in_grid(board_identifier, grids):
-        # if 'AB' then get just 'B', because that's the columns
-        selected_grid = []
-        for index, grid in enumerate(grids):
-            for element in grid:
-                if element == board_identifier:
-                    selected_grid = list(grid)
-                    break
-
-        selected_grid.remove(board_identifier)
-        return selected_grid
-
+    def generate_values(grid_size):
+        number_of_values = grid_size * grid_size
+        if number_of_values > len(VALUE_CHARS):
+            raise ValueError(f"A board of {number_of_values} values has no char for each value, use generate_tokens")
+        return VALUE_CHARS[:number_of_values]
+
+    # Returns the tokens of the values of a board in a board line, in the order of the bits of BitDomain - the
+    # chars of generate_values up to 25x25, and the numbers of the values for bigger boards
+    # Ex: ('1', ..., '9', 'A', ..., 'P') for 25x25, ('1', '2', ..., '36') for 36x36
     @staticmethod
-    def __generate_grids(identifiers, grid_size):
-        split_identifiers = []
-        for i in range(grid_size):
-            start = i * grid_size
-            end = grid_size * (i + 1)
-            selected = identifiers[start:end]
-            split_identifiers.append(list(selected))
-
-        grids = []
-        for row in split_identifiers:
-            # ["A", "B", "C"]
-            for column in split_identifiers:
-                # ["A", "B", "C"]
-                inner_grid = []
-                for identifier_row in row:
-                    for identifier_column in column:
-                        inner_grid.append(identifier_row + identifier_column)
-
-                grids.append(inner_grid)
-
-        return grids
-
+    def generate_tokens(grid_size):
+        number_of_values = grid_size * grid_size
+        if number_of_values <= len(VALUE_CHARS):
+            return tuple(VALUE_CHARS[:number_of_values])
+        return tuple(str(value) for value in range(1, number_of_values + 1))
+
+    # Returns the values of the cells of a board line as numbers (0 for an empty cell, k for the k-th value of
+    # generate_tokens) and the grid size of the board.
+    # A line is n^2 chars, or n^2 tokens separated by spaces or commas - the numbers of the values, or their chars
+    # Ex: '530070000...' or '5 3 0 0 7 0 0 0 0 ...', '1 0 36 0 ...' for 36x36
     @staticmethod
-    def __generate_board_identifiers(grid_size):
-        identifiers = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
-        board_size = grid_size * grid_size
-
-        rows_selected = columns_selected = identifiers[:board_size]
-        board = []
-        for row_identifier in rows_selected:
-            for column_identifier in columns_selected:
-                board.append(row_identifier + column_identifier)
-
-        return board
-
+    def parse_line(line_board):
+        line = line_board.strip()
+        if ' ' in line or ',' in line:
+            tokens = line.replace(',', ' ').split()
+        else:
+            tokens = line
+        grid_size = int(round(len(tokens) ** 0.25))
+        if grid_size ** 4 != len(tokens) or grid_size == 0:
+            raise ValueError(f"A board of {len(tokens)} cells is not a square of a square")
+
+        codes = CUtil.__codes.get(grid_size)
+        if codes is None:
+            codes = {'0': 0}
+            for value, token in enumerate(CUtil.generate_tokens(grid_size), start=1):
+                codes[token] = value
+                codes[str(value)] = value
+            CUtil.__codes[grid_size] = codes
+        try:
+            return [codes[token] for token in tokens], grid_size
+        except KeyError as error:
+            raise ValueError(f"{error.args[0]} is not a value of a board of {grid_size ** 2} values") from None
+
+    # Returns the board line of the values of the cells (numbers, 0 for an empty cell) - chars up to 25x25,
+    # tokens separated by spaces for bigger boards
     @staticmethod
-    def __testing9x9():
-        string = "ABCDEFGHI"
-
-        output_string = ""
-        for letter1 in string:
-            for letter2 in string:
-                output_string += letter1 + letter2 + " "
-
-            output_string += "\n"
-
-        print(output_string)
\ No newline at end of file
+    def format_line(cells, grid_size):
+        tokens = ('0',) + CUtil.generate_tokens(grid_size)
+        separator = '' if grid_size * grid_size <= len(VALUE_CHARS) else ' '
+        return separator.join(tokens[value] for value in cells)
@@ -1,35 +1,75 @@
 """
     This class sets the constraints for our sudoku.
 
-                AA AB  AC AD
-                BA BB  BC BD
+                 0  1   2  3
+                 4  5   6  7
 
-                CA CB  CC CD
-                DA DB  DC DD
+                 8  9  10 11
+                12 13  14 15
 
     In the above 4x4 sudoku grid,
-    The grid for AA is: AB BA BB
+    The grid for 0 is: 1 4 5
     The explicit constraint is given as follows:
         1. The numbers in the following pairs of squares cannot be the same:
-            (AA,AB), (AA,AC), (AA, AD), (AA,BA), (AA,CA), (AA,DA), (AA,BB)
+            (0,1), (0,2), (0,3), (0,4), (0,8), (0,12), (0,5)
 
         The above constraints needs to be written for every cell in the sudoku. This can be extended similarly
-        for NxN sudoku.
+        for NxN sudoku. They depend only on the size of the sudoku, so they are taken from the shared Topology.
 """
-from backtraking.CUtil import CUtil
 
 
 class Constraint:
     """
         Args:
-            board: A dictionary with key as the identifier to a cell and the value of the key is the value of the cell
-            constraints: A dictionary with key as identifier to a cell and values is identifier to other cells
-                         that cant have the same value as the current identifier (the explicit constraints), this includes
-                         cells in the same row, same column and same grid
-            grid_size: size of a grid (a 9x9 sudoku has 3 as its grid size, 4x4 sudoku as 2 as its grid size)
+            board: A list with the value of each cell, indexed by the cell number
+            topology: The Topology of the grid size, neighbour is its peers - for each cell, the cells
+                      that cant have the same value as the current cell (the explicit constraints), this includes
+                      cells in the same row, same column and same grid
+            bitmask: True if the values of the board are integer masks (BitDomain) instead of strings of candidates
+
+        trail: the log of the changes made to the board during the search, as (cell, previous domain) pairs.
+               The search remembers the length of the trail before it tries a value, and undo() rolls the board
+               back to that mark, so only the cells that actually changed are restored.
+        undone: the number of changes undo() took off the trail, with the length of the trail it is the number of
+                domains reduced so far
+        remaining_values: the MinimumRemainingValues index of the search, told about every change of a domain,
+                          None when the search does not use MRV
+        propagation: the Propagation stage of the board, told about every change of a domain,
+                     None when the board is not propagated
     """
-    def __init__(self, board, constraints, grid_size):
-        self.grid_size = grid_size
-        self.neighbour = constraints
-        self.constraints_tuples = CUtil.constraints_as_tuple(self.neighbour)  # constraints as tuples
+    def __init__(self, board, topology, bitmask=False):
+        self.topology = topology
+        self.grid_size = topology.grid_size
+        self.neighbour = topology.peers
+        self.constraints_tuples = topology.arcs  # constraints as tuples
         self.board = board
+        self.bitmask = bitmask
+        self.trail = []
+        self.undone = 0
+        self.remaining_values = None
+        self.propagation = None
+
+    # Narrow the domain of the cell to domain (a part of its current domain), on the trail
+    def reduce(self, cell, domain):
+        previous = self.board[cell]
+        self.trail.append((cell, previous))
+        self.board[cell] = domain
+        if self.remaining_values is not None:
+            self.remaining_values.update(cell, domain)
+        if self.propagation is not None:
+            self.propagation.removed(cell, previous ^ domain, domain)
+
+    # Restore the domains changed since the trail had the length of mark, the latest change first
+    def undo(self, mark):
+        trail = self.trail
+        board = self.board
+        remaining_values = self.remaining_values
+        propagation = self.propagation
+        self.undone += len(trail) - mark
+        while len(trail) > mark:
+            cell, domain = trail.pop()
+            if propagation is not None:
+                propagation.restored(cell, domain ^ board[cell])
+            board[cell] = domain
+            if remaining_values is not None:
+                remaining_values.update(cell, domain)
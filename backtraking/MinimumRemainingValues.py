@@ -0,0 +1,75 @@
+"""
+    Incremental index of the unassigned cells by the size of their domain, for the MRV heuristic.
+
+    Instead of measuring the domain of every unassigned cell at every node, the cells are kept in buckets
+    by domain size, and each bucket is an integer with one bit per cell:
+
+                buckets[1] = 0b1000100    cells 2 and 6 have one value left
+                buckets[2] = 0b0010000    cell 4 has two values left
+
+    The search tells the index when a cell is assigned or unassigned, and forward checking and undo tell it
+    when a domain changes, so selecting the next cell only looks for the first non empty bucket.
+    The lowest bit of the bucket is the first cell in the board order, the same cell the full scan picks.
+
+    With degree=True, ties in a bucket are broken by the number of unassigned peers of the cell (the degree
+    heuristic), the most constrained cell first.
+"""
+from backtraking.BitDomain import popcount
+
+
+class MinimumRemainingValues:
+    def __init__(self, constraint, state, degree=False):
+        self.size = popcount if constraint.bitmask else len
+        self.sizes = [self.size(domain) for domain in constraint.board]
+        self.buckets = [0] * (max(self.sizes, default=0) + 1)
+        for cell, size in enumerate(self.sizes):
+            if cell not in state:
+                self.buckets[size] |= 1 << cell
+
+        self.peers = constraint.neighbour
+        self.degrees = None
+        if degree:
+            self.degrees = [sum(1 for peer in self.peers[cell] if peer not in state)
+                            for cell in range(len(self.sizes))]
+
+    def assign(self, cell):
+        self.buckets[self.sizes[cell]] &= ~(1 << cell)
+        if self.degrees is not None:
+            for peer in self.peers[cell]:
+                self.degrees[peer] -= 1
+
+    def unassign(self, cell):
+        self.buckets[self.sizes[cell]] |= 1 << cell
+        if self.degrees is not None:
+            for peer in self.peers[cell]:
+                self.degrees[peer] += 1
+
+    # The domain of the cell has changed (by forward checking or by undo)
+    def update(self, cell, domain):
+        size = self.size(domain)
+        old_size = self.sizes[cell]
+        if size != old_size:
+            self.sizes[cell] = size
+            bit = 1 << cell
+            if self.buckets[old_size] & bit:
+                self.buckets[old_size] ^= bit
+                self.buckets[size] |= bit
+
+    # Returns the unassigned cell with the minimum remaining values, or None if all the cells are assigned
+    def select(self):
+        for bucket in self.buckets:
+            if bucket:
+                if self.degrees is None:
+                    return (bucket & -bucket).bit_length() - 1
+                return self.__max_degree(bucket)
+        return None
+
+    def __max_degree(self, bucket):
+        selected = None
+        while bucket:
+            bit = bucket & -bucket
+            cell = bit.bit_length() - 1
+            if selected is None or self.degrees[cell] > self.degrees[selected]:
+                selected = cell
+            bucket ^= bit
+        return selected
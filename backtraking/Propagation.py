@@ -0,0 +1,229 @@
+"""
+    Constraint propagation for a board of masks (BitDomain), applied until no rule can remove a value.
+
+    The rules, each of them can be switched on its own:
+        naked_singles:  a cell with a single value left - remove that value from its peers
+        hidden_singles: a value that only one cell of a unit can take - that cell gets the value,
+                        and a value that no cell of a unit can take is a contradiction
+        naked_pairs:    two cells of a unit with the same two values left - remove them from the rest of the unit
+        hidden_pairs:   two values that only the same two cells of a unit can take - those cells keep only them
+        pointing:       the cells of a grid that can take a value are all in one row (or column) - remove the value
+                        from that row outside the grid, and the claiming counterpart: the cells of a row (or column)
+                        that can take a value are all in one grid - remove the value from the rest of the grid
+
+    For every unit the stage keeps the number of cells that can take each value:
+
+                counts[unit][value] = 2    two cells of the unit still have the value in their domain
+
+    The counts are kept up to date on every change of a domain (Constraint.reduce and Constraint.undo),
+    so the hidden singles are found from the units whose count has just dropped, without scanning the board.
+    The singles are handled from work queues, the pairs and pointing rules scan the units once the singles are
+    exhausted. steps counts the rounds of the rules - a single handled or a scan of the pair and pointing rules.
+"""
+from collections import deque
+
+from backtraking.BitDomain import BitDomain
+
+
+class Propagation:
+    NAKED_SINGLES = "naked_singles"
+    HIDDEN_SINGLES = "hidden_singles"
+    NAKED_PAIRS = "naked_pairs"
+    HIDDEN_PAIRS = "hidden_pairs"
+    POINTING = "pointing"
+    RULES = (NAKED_SINGLES, HIDDEN_SINGLES, NAKED_PAIRS, HIDDEN_PAIRS, POINTING)
+
+    def __init__(self, constraint, rules=RULES):
+        if not constraint.bitmask:
+            raise ValueError("Propagation needs a board of masks (bitmask=True)")
+        for rule in rules:
+            if rule not in Propagation.RULES:
+                raise ValueError(f"Unknown propagation rule: {rule}")
+
+        self.constraint = constraint
+        self.naked_singles = Propagation.NAKED_SINGLES in rules
+        self.hidden_singles = Propagation.HIDDEN_SINGLES in rules
+        self.naked_pairs = Propagation.NAKED_PAIRS in rules
+        self.hidden_pairs = Propagation.HIDDEN_PAIRS in rules
+        self.pointing = Propagation.POINTING in rules
+        self.steps = 0
+
+        topology = constraint.topology
+        self.units = topology.units
+        self.cell_units = topology.cell_units
+        self.peers = topology.peers
+        self.board_size = topology.board_size
+
+        board = constraint.board
+        self.counts = [[0] * self.board_size for _ in self.units]
+        for unit, cells in enumerate(self.units):
+            unit_counts = self.counts[unit]
+            for cell in cells:
+                for bit in BitDomain.bits(board[cell]):
+                    unit_counts[bit.bit_length() - 1] += 1
+
+        # the work queues: the cells that became singles and the (unit, value) counts that dropped to 0 or 1
+        self.singles = deque(cell for cell, domain in enumerate(board) if BitDomain.is_single(domain))
+        self.hidden = deque((unit, 1 << value) for unit, unit_counts in enumerate(self.counts)
+                            for value, count in enumerate(unit_counts) if count <= 1)
+
+        constraint.propagation = self
+
+    # Update the counts for the values removed from the domain of the cell
+    def removed(self, cell, values, domain):
+        counts = self.counts
+        hidden = self.hidden
+        for bit in BitDomain.bits(values):
+            value = bit.bit_length() - 1
+            for unit in self.cell_units[cell]:
+                counts[unit][value] -= 1
+                if counts[unit][value] <= 1:
+                    hidden.append((unit, bit))
+        if not domain & (domain - 1):
+            self.singles.append(cell)
+
+    # Update the counts for the values given back to the domain of the cell
+    def restored(self, cell, values):
+        counts = self.counts
+        for bit in BitDomain.bits(values):
+            value = bit.bit_length() - 1
+            for unit in self.cell_units[cell]:
+                counts[unit][value] += 1
+
+    # Assign the value to the cell and propagate, returns False if the assignment leads to a contradiction
+    def assign(self, cell, value):
+        if self.constraint.board[cell] != value:
+            self.constraint.reduce(cell, value)
+        return self.propagate()
+
+    # Apply the rules until nothing changes, returns False if a domain or a unit runs out of values
+    def propagate(self):
+        while True:
+            self.steps += 1
+            if self.naked_singles and self.singles:
+                consistent = self.__naked_single(self.singles.popleft())
+            elif self.hidden_singles and self.hidden:
+                consistent = self.__hidden_single(*self.hidden.popleft())
+            else:
+                self.singles.clear()
+                self.hidden.clear()
+                consistent, changed = self.__scan()
+                if consistent and not changed:
+                    return True
+
+            if not consistent:
+                # the queues hold cells and counts of domains the search is about to undo
+                self.singles.clear()
+                self.hidden.clear()
+                return False
+
+    # The pair and pointing rules over all the units, returns False if a domain runs out of values and whether a
+    # domain changed
+    def __scan(self):
+        changed = False
+        for enabled, rule in ((self.naked_pairs, self.__naked_pairs), (self.hidden_pairs, self.__hidden_pairs),
+                              (self.pointing, self.__pointing)):
+            if enabled:
+                consistent, rule_changed = rule()
+                if not consistent:
+                    return False, changed
+                changed = rule_changed or changed
+        return True, changed
+
+    # Remove the values from the domain of the cell, returns False if nothing would be left
+    def __remove(self, cell, values):
+        domain = self.constraint.board[cell]
+        if domain & values:
+            domain &= ~values
+            if not domain:
+                return False
+            self.constraint.reduce(cell, domain)
+        return True
+
+    def __naked_single(self, cell):
+        value = self.constraint.board[cell]
+        if not BitDomain.is_single(value):
+            # a single of a domain that was given back values since it was queued
+            return True
+        for peer in self.peers[cell]:
+            if not self.__remove(peer, value):
+                return False
+        return True
+
+    def __hidden_single(self, unit, value):
+        count = self.counts[unit][value.bit_length() - 1]
+        if count == 0:
+            return False
+        if count == 1:
+            board = self.constraint.board
+            for cell in self.units[unit]:
+                if board[cell] & value:
+                    if board[cell] != value:
+                        self.constraint.reduce(cell, value)
+                    break
+        return True
+
+    def __naked_pairs(self):
+        board = self.constraint.board
+        changed = False
+        for cells in self.units:
+            seen = dict()
+            for cell in cells:
+                domain = board[cell]
+                if BitDomain.size(domain) != 2:
+                    continue
+                if domain not in seen:
+                    seen[domain] = cell
+                    continue
+                pair = (seen[domain], cell)
+                for other in cells:
+                    if other not in pair and board[other] & domain:
+                        if not self.__remove(other, domain):
+                            return False, changed
+                        changed = True
+        return True, changed
+
+    def __hidden_pairs(self):
+        board = self.constraint.board
+        changed = False
+        for unit, cells in enumerate(self.units):
+            seen = dict()  # the two cells -> the value that only they can take
+            for value, count in enumerate(self.counts[unit]):
+                if count != 2:
+                    continue
+                bit = 1 << value
+                pair = tuple(cell for cell in cells if board[cell] & bit)
+                if pair not in seen:
+                    seen[pair] = bit
+                    continue
+                values = seen[pair] | bit
+                for cell in pair:
+                    if board[cell] & ~values:
+                        self.constraint.reduce(cell, board[cell] & values)
+                        changed = True
+        return True, changed
+
+    def __pointing(self):
+        board = self.constraint.board
+        size = self.board_size
+        changed = False
+        for unit, cells in enumerate(self.units):
+            # rows and columns claim for their grid, grids point to a row or a column
+            is_grid = unit >= 2 * size
+            for value, count in enumerate(self.counts[unit]):
+                if count < 2:
+                    continue
+                bit = 1 << value
+                lines = [cell for cell in cells if board[cell] & bit]
+                if is_grid:
+                    targets = [self.cell_units[lines[0]][0], self.cell_units[lines[0]][1]]
+                else:
+                    targets = [self.cell_units[lines[0]][2]]
+                for target in targets:
+                    if all(target in self.cell_units[cell] for cell in lines):
+                        for other in self.units[target]:
+                            if other not in cells and board[other] & bit:
+                                if not self.__remove(other, bit):
+                                    return False, changed
+                                changed = True
+        return True, changed
@@ -0,0 +1,64 @@
+"""
+    The counters and the phase timings of the solve of one board.
+
+        nodes:        calls of the search, one for every assignment it went into (and the first call)
+        backtracks:   values the search took back (BackTracking.time)
+        propagations: rounds of the Propagation rules - singles handled and scans of the pair and pointing rules
+        removals:     domains reduced by the search, the propagation and AC-3
+        revisions:    arcs revised by AC-3
+        phases:       seconds spent in each phase, for the backtracking solver: parse, topology, ac3, propagation,
+                      search and output
+
+    The solvers keep the counters as plain integers of the objects they already have (the trail of the
+    Constraint counts the removals), and build a SolveStats only when one is asked for, so the counting costs
+    next to nothing when the stats are not collected.
+"""
+import time
+from contextlib import contextmanager, nullcontext
+
+
+class SolveStats:
+    def __init__(self):
+        self.nodes = 0
+        self.backtracks = 0
+        self.propagations = 0
+        self.removals = 0
+        self.revisions = 0
+        self.phases = dict()  # phase name -> seconds
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0) + time.perf_counter() - start
+
+    # Time the phase when there are stats to fill, stats may be None
+    @staticmethod
+    def timed(stats, name):
+        if stats is None:
+            return nullcontext()
+        return stats.phase(name)
+
+    # Add the counters of the objects of a solve: BackTracking, ArcConsistency, Propagation and the Constraint
+    def collect(self, back_track=None, arc=None, propagation=None, constraint=None):
+        if back_track is not None:
+            self.nodes += back_track.nodes
+            self.backtracks += back_track.time
+        if arc is not None:
+            self.revisions += arc.nodes_expanded
+            self.removals += arc.removals
+        if propagation is not None:
+            self.propagations += propagation.steps
+        if constraint is not None:
+            self.removals += constraint.undone + len(constraint.trail)
+
+    def as_dict(self):
+        return {"nodes": self.nodes, "backtracks": self.backtracks, "propagations": self.propagations,
+                "removals": self.removals, "revisions": self.revisions, "phases": dict(self.phases)}
+
+    def __str__(self):
+        phases = ", ".join(f"{name} {seconds:.4f}s" for name, seconds in self.phases.items())
+        return (f"nodes {self.nodes}, backtracks {self.backtracks}, propagations {self.propagations},"
+                f" removals {self.removals}, revisions {self.revisions}, phases: {phases}")
@@ -0,0 +1,71 @@
+"""
+    The structure of a sudoku of a given grid size - which cells constrain which.
+
+    The structure depends only on the grid size, so it is built once per size and shared by every board
+    of that size. Cells are addressed by their flat index in the board line (row * board_size + column):
+
+                0  1   2  3
+                4  5   6  7
+
+                8  9  10 11
+               12 13  14 15
+
+    In the above 4x4 sudoku grid,
+        units:     every row, column and grid as a tuple of cells, rows first, then columns, then grids
+                   Ex: (0, 1, 2, 3), ... (0, 4, 8, 12), ... (0, 1, 4, 5), ...
+        cell_units: the (row, column, grid) unit numbers of each cell. Ex: cell 5 -> (1, 5, 8)
+        peers:     the cells that cant have the same value as the cell. Ex: cell 0 -> (1, 2, 3, 4, 5, 8, 12)
+        arcs:      every (cell, peer) pair. Ex: (0, 1), (0, 2) ....
+        incoming_arcs: the numbers of the arcs (peer, cell) of each cell, as positions in arcs
+"""
+
+
+class Topology:
+    __topologies = dict()  # grid size -> Topology, shared by every board of that size
+
+    def __init__(self, grid_size):
+        board_size = grid_size * grid_size
+
+        self.grid_size = grid_size
+        self.board_size = board_size
+        self.number_of_cells = board_size * board_size
+
+        rows = [tuple(row * board_size + column for column in range(board_size)) for row in range(board_size)]
+        columns = [tuple(row * board_size + column for row in range(board_size)) for column in range(board_size)]
+        grids = []
+        for grid_row in range(0, board_size, grid_size):
+            for grid_column in range(0, board_size, grid_size):
+                grids.append(tuple((grid_row + row) * board_size + grid_column + column
+                                   for row in range(grid_size) for column in range(grid_size)))
+        self.units = tuple(rows + columns + grids)
+
+        cell_units = [[] for _ in range(self.number_of_cells)]
+        for unit_number, unit in enumerate(self.units):
+            for cell in unit:
+                cell_units[cell].append(unit_number)
+        self.cell_units = tuple(tuple(units) for units in cell_units)
+
+        peers = []
+        for cell in range(self.number_of_cells):
+            others = set()
+            for unit_number in self.cell_units[cell]:
+                others.update(self.units[unit_number])
+            others.discard(cell)
+            peers.append(tuple(sorted(others)))
+        self.peers = tuple(peers)
+
+        self.arcs = tuple((cell, peer) for cell in range(self.number_of_cells) for peer in self.peers[cell])
+
+        incoming_arcs = [[] for _ in range(self.number_of_cells)]
+        for arc, (cell, peer) in enumerate(self.arcs):
+            incoming_arcs[peer].append(arc)
+        self.incoming_arcs = tuple(tuple(arcs) for arcs in incoming_arcs)
+
+    # Returns the topology of the grid size, building it on the first request only
+    @staticmethod
+    def get(grid_size):
+        topology = Topology.__topologies.get(grid_size)
+        if topology is None:
+            topology = Topology(grid_size)
+            Topology.__topologies[grid_size] = topology
+        return topology
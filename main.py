@@ -1,26 +1,28 @@
+import sys
 import time
 import BacktrackSolver as BkSolver
 import LinearProgrammingSolver as LpSolver
-import random
+import DancingLinksSolver as DlxSolver
+from BoardSource import open_corpus, read_boards
+from ReportScheduler import ReportScheduler
+import StreamSolver
 
 
 def read_from_txt(text_file):
     """ A function that return boards that saved on text file
         :param text_file: file in format n^2 chars or number in a row
-        :return: boards: all boards that in the file
+        :return: boards: all boards that in the file, read one at a time while they are solved
         """
-    fp = open(text_file, "r")
-    boards = fp.readlines()
-    return boards
+    return read_boards(text_file)
 
 
 def random_line(text_file):
     """ Return a random line from file
-        :param text_file: file in format n^2 chars or number in a row
-        :return: one random board that in the file
+        :param text_file: file in format n^2 chars or number in a row, or a packed corpus
+        :return: one random board that in the file, found by the index of the file (see BoardSource)
         """
-    lines = open(text_file).read().splitlines()
-    my_line = random.choice(lines)
+    with open_corpus(text_file) as boards:
+        my_line = boards.random_board()
     return [my_line+"\n"]
 
 
@@ -66,26 +68,9 @@ def create_report_easy_backtracking():
     # List of solvers name
     solvers = ["bk_arc_fc_mrv", "bk_arc_fc", "bk_fc_mrv", "bk_arc_mrv", "bk_arc", "bk_fc", "bk_mrv"]
 
-    for file in sudoku_files:
-        boards = read_from_txt(file[0])
-        for solver in solvers:
-            # Create txt file and save result. format: board number, attempts backtracking, time
-            f = open(solver+file[1]+".txt", 'w')
-
-            arc, mrv, fc = False, False, False
-            if "arc" in solver:
-                arc = True
-            if "mrv" in solver:
-                mrv = True
-            if "fc" in solver:
-                fc = True
-
-            # Create solver
-            backtracking_solver = BkSolver.BacktrackingSolver(boards, print_to_screen=False, arc=arc,
-                                                              forward_check=fc, mrv=mrv, print_to_file=f)
-            solve_all(backtracking_solver)
-            f.close()
-            del backtracking_solver
+    # Solve every board of every file with every solver in parallel, finished boards are kept in checkpoints
+    # format of the files: board number, attempts backtracking, time
+    ReportScheduler(sudoku_files, solvers).run()
 
 
 def create_report_hard_backtracking():
@@ -97,26 +82,9 @@ def create_report_hard_backtracking():
     # List of solvers name
     solvers = ["bk_arc_fc_mrv", "bk_arc_fc", "bk_fc_mrv", "bk_arc_mrv"]
 
-    for file in sudoku_files:
-        boards = read_from_txt(file[0])
-        for solver in solvers:
-            # Create txt file and save result. format: board number, attempts backtracking, time
-            f = open(solver + file[1] + ".txt", 'w')
-
-            arc, mrv, fc = False, False, False
-            if "arc" in solver:
-                arc = True
-            if "mrv" in solver:
-                mrv = True
-            if "fc" in solver:
-                fc = True
-
-            # Create solver
-            backtracking_solver = BkSolver.BacktrackingSolver(boards, print_to_screen=False, arc=arc,
-                                                              forward_check=fc, mrv=mrv, print_to_file=f)
-            solve_all(backtracking_solver)
-            f.close()
-            del backtracking_solver
+    # Solve every board of every file with every solver in parallel, finished boards are kept in checkpoints
+    # format of the files: board number, attempts backtracking, time
+    ReportScheduler(sudoku_files, solvers).run()
 
 
 def create_report_lp_and_bt():
@@ -125,31 +93,11 @@ def create_report_lp_and_bt():
     # List of sudokus files to solve
     sudoku_files = [("sudoku_boards_txt/easy_1000.txt", "_easy_1000"), ("sudoku_boards_txt/sudoku_16.txt", "_big_16"), ("sudoku_boards_txt/hard_95.txt", "_hard_95"), ("sudoku_boards_txt/sudoku_25.txt", "_huge_25")]
     # List of solvers name
-    solvers = ["lr", "bk_arc_fc_mrv"]
-
-    for file in sudoku_files:
-        boards = read_from_txt(file[0])
-        for solver in solvers:
-            # Create txt file and save result. format: board number, attempts backtracking, time
-            f = open(solver + file[1] + ".txt", 'w')
-
-            arc, mrv, fc = False, False, False
-            if "arc" in solver:
-                arc = True
-            if "mrv" in solver:
-                mrv = True
-            if "fc" in solver:
-                fc = True
+    solvers = ["lr", "bk_arc_fc_mrv", "dlx"]
 
-            if solver == "lr":
-                my_solver = LpSolver.LinearProgrammingSolver(boards, print_to_screen=False, print_to_file=f)
-            else:
-                # Create solver
-                my_solver = BkSolver.BacktrackingSolver(boards, print_to_screen=False, arc=arc,
-                                                              forward_check=fc, mrv=mrv, print_to_file=f)
-            solve_all(my_solver)
-            f.close()
-            del my_solver
+    # Solve every board of every file with every solver in parallel, finished boards are kept in checkpoints
+    # format of the files: board number, attempts backtracking, time
+    ReportScheduler(sudoku_files, solvers).run()
 
 
 def start_solve_user_boards():
@@ -176,7 +124,7 @@ def start_solve_user_boards():
         display_sudoku_problem(board)
 
         use_solver = input(f"What solver do you want to use?\n\t"
-                                f"1. Backtracking \n\t2. Linear Programming\n")
+                                f"1. Backtracking \n\t2. Linear Programming\n\t3. Dancing Links\n")
         if use_solver == "1":
             heuristics = input(f"What Heuristics do you want?\n"
                                f"You can select several heuristics! for example 12: Arc + Mrv\n\t"
@@ -193,6 +141,8 @@ def start_solve_user_boards():
 
         elif use_solver == "2":
             solver = LpSolver.LinearProgrammingSolver(board, print_to_screen=True)
+        elif use_solver == "3":
+            solver = DlxSolver.DancingLinksSolver(board, print_to_screen=True)
         else:
             print("Error Invalid selection")
             continue
@@ -209,7 +159,8 @@ def main():
         if select == "1":
             start_solve_user_boards()
         elif select == "2":
-            if  input("The process of building the report takes several hours,"
+            if  input("The process of building the report takes several hours on one core, it runs on all the cores"
+                      " and a stopped report continues where it stopped,"
                       " if you are sure you want to continue, press y\n") == "y":
                 create_report_easy_backtracking()
                 create_report_hard_backtracking()
@@ -219,4 +170,7 @@ def main():
 
 
 if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        # boards given on the command line are solved without prompts (see StreamSolver)
+        sys.exit(StreamSolver.main())
     main()
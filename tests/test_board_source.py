@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+
+from BoardSource import PackedBoardFile, pack_corpus
+from backtraking.CUtil import CUtil
+
+
+def pattern_board(box_size, empty_every=3):
+    """ A solved grid of the classic pattern, with every empty_every-th cell emptied, as a board line """
+    board_size = box_size * box_size
+    cells = [(box_size * (row % box_size) + row // box_size + column) % board_size + 1
+             for row in range(board_size) for column in range(board_size)]
+    for cell in range(0, len(cells), empty_every):
+        cells[cell] = 0
+    return CUtil.format_line(cells, box_size)
+
+
+class PackedCorpusTest(unittest.TestCase):
+    def round_trip(self, boards):
+        with tempfile.TemporaryDirectory() as directory:
+            text_path = os.path.join(directory, "corpus.txt")
+            packed_path = os.path.join(directory, "corpus.pak")
+            with open(text_path, 'w') as fp:
+                fp.write("\n".join(boards) + "\n")
+            self.assertEqual(pack_corpus(text_path, packed_path), len(boards))
+            with PackedBoardFile(packed_path) as packed:
+                return packed.bits, list(packed)
+
+    def test_9x9_nibbles(self):
+        boards = [pattern_board(3), pattern_board(3, empty_every=2)]
+        self.assertEqual(self.round_trip(boards), (4, boards))
+
+    def test_16x16_chars(self):
+        boards = [pattern_board(4)]
+        self.assertEqual(self.round_trip(boards), (8, boards))
+
+    def test_36x36_tokens(self):
+        board = pattern_board(6)
+        self.assertIn(" ", board)
+        # a token line separated by commas packs to the same board
+        bits, boards = self.round_trip([board, board.replace(" ", ",")])
+        self.assertEqual((bits, boards), (8, [board, board]))
+        self.assertEqual(CUtil.parse_line(boards[0]), CUtil.parse_line(board))
+
+    def test_256_values_two_bytes(self):
+        boards = [pattern_board(16, empty_every=5)]
+        self.assertEqual(self.round_trip(boards), (16, boards))
+
+    def test_mixed_sizes_rejected(self):
+        with self.assertRaises(ValueError):
+            self.round_trip([pattern_board(3), pattern_board(4)])
+
+
+if __name__ == '__main__':
+    unittest.main()